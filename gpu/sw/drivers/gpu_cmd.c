@@ -0,0 +1,145 @@
+#include "gpu_driver.h"
+#include <pthread.h>
+#include <semaphore.h>
+#include <stdatomic.h>
+#include <stdlib.h>
+
+// single-producer/single-consumer ring of command descriptors.
+// the caller enqueues without taking any lock, a worker thread drains it
+// and issues the mmio traffic so the caller never blocks on the device.
+// the worker is the only thread that touches the device while the ring is
+// live, which is why control commands are queued here as well.
+
+#define GPU_CMD_RING_SIZE 16 // must be a power of two
+
+struct gpu_cmd_ring_t {
+    gpu_device_t* dev;
+    gpu_cmd_t slots[GPU_CMD_RING_SIZE];
+    atomic_size_t head; // next slot to fill, written by the producer only
+    atomic_size_t tail; // next slot to drain, written by the worker only
+    atomic_uint errors; // commands that failed since the last wait
+    atomic_bool stop;
+    sem_t pending;
+    pthread_t worker;
+};
+
+// --- internal helpers ---
+
+static bool gpu_cmd_execute(gpu_device_t* dev, const gpu_cmd_t* cmd) {
+    switch (cmd->op) {
+    case GPU_CMD_LOAD_SHADER:
+        return gpu_load_shader(dev, cmd->data, cmd->count);
+    case GPU_CMD_RESET:
+        gpu_reset(dev);
+        return true;
+    case GPU_CMD_START:
+        gpu_start(dev);
+        return true;
+    case GPU_CMD_STOP:
+        gpu_stop(dev);
+        return true;
+    default:
+        return false;
+    }
+}
+
+static void* gpu_cmd_worker(void* arg) {
+    gpu_cmd_ring_t* ring = (gpu_cmd_ring_t*)arg;
+
+    for (;;) {
+        sem_wait(&ring->pending);
+
+        size_t tail = atomic_load_explicit(&ring->tail, memory_order_relaxed);
+        size_t head = atomic_load_explicit(&ring->head, memory_order_acquire);
+        if (tail == head) {
+            // woken with nothing queued, only happens on shutdown
+            if (atomic_load(&ring->stop)) {
+                break;
+            }
+            continue;
+        }
+
+        if (!gpu_cmd_execute(ring->dev, &ring->slots[tail & (GPU_CMD_RING_SIZE - 1)])) {
+            atomic_fetch_add(&ring->errors, 1);
+        }
+        atomic_store_explicit(&ring->tail, tail + 1, memory_order_release);
+    }
+    return NULL;
+}
+
+// --- public api implementation ---
+
+gpu_cmd_ring_t* gpu_cmd_ring_create(gpu_device_t* dev) {
+    if (dev == NULL) {
+        return NULL;
+    }
+    gpu_cmd_ring_t* ring = (gpu_cmd_ring_t*)calloc(1, sizeof(gpu_cmd_ring_t));
+    if (ring == NULL) {
+        return NULL;
+    }
+    ring->dev = dev;
+    atomic_init(&ring->head, 0);
+    atomic_init(&ring->tail, 0);
+    atomic_init(&ring->errors, 0);
+    atomic_init(&ring->stop, false);
+
+    if (sem_init(&ring->pending, 0, 0) != 0) {
+        free(ring);
+        return NULL;
+    }
+    if (pthread_create(&ring->worker, NULL, gpu_cmd_worker, ring) != 0) {
+        sem_destroy(&ring->pending);
+        free(ring);
+        return NULL;
+    }
+    return ring;
+}
+
+void gpu_cmd_ring_destroy(gpu_cmd_ring_t* ring) {
+    if (ring == NULL) {
+        return;
+    }
+    // queued commands are drained before the worker sees the stop request
+    atomic_store(&ring->stop, true);
+    sem_post(&ring->pending);
+    pthread_join(ring->worker, NULL);
+    sem_destroy(&ring->pending);
+    free(ring);
+}
+
+bool gpu_submit_cmd(gpu_cmd_ring_t* ring, const gpu_cmd_t* cmd) {
+    if (ring == NULL || cmd == NULL) {
+        return false;
+    }
+    size_t head = atomic_load_explicit(&ring->head, memory_order_relaxed);
+    size_t tail = atomic_load_explicit(&ring->tail, memory_order_acquire);
+    if (head - tail == GPU_CMD_RING_SIZE) {
+        return false; // ring full
+    }
+
+    // the descriptor is copied, so the caller may reuse it right away
+    ring->slots[head & (GPU_CMD_RING_SIZE - 1)] = *cmd;
+    atomic_store_explicit(&ring->head, head + 1, memory_order_release);
+    sem_post(&ring->pending);
+    return true;
+}
+
+bool gpu_cmd_ring_wait(gpu_cmd_ring_t* ring, uint32_t timeout_cycles) {
+    if (ring == NULL) {
+        return false;
+    }
+    size_t head = atomic_load_explicit(&ring->head, memory_order_relaxed);
+    while (atomic_load_explicit(&ring->tail, memory_order_acquire) != head) {
+        if (timeout_cycles-- == 0) {
+            return false; // timed out
+        }
+    }
+    return true; // drained
+}
+
+uint32_t gpu_cmd_ring_errors(gpu_cmd_ring_t* ring) {
+    if (ring == NULL) {
+        return 0;
+    }
+    return atomic_exchange(&ring->errors, 0);
+}
@@ -1,6 +1,8 @@
+#define _DEFAULT_SOURCE // MAP_ANONYMOUS
 #include "gpu_driver.h"
 #include "gpu_regs.h"
 #include <stdlib.h> 
+#include <sys/mman.h>
 
 // private device struct
 // base is marked volatile so MMIO reads/writes aren’t optimized away
@@ -49,4 +51,27 @@ void gpu_start(gpu_device_t* dev) {
 void gpu_stop(gpu_device_t* dev) {
     uint32_t ctrl = gpu_reg_read(dev, GPU_REG_CONTROL);
     gpu_reg_write(dev, GPU_REG_CONTROL, ctrl & ~GPU_CONTROL_START_MASK);
+}
+
+void* gpu_alloc_pinned(size_t nbytes) {
+    if (nbytes == 0) {
+        return NULL;
+    }
+    void* buf = mmap(NULL, nbytes, PROT_READ | PROT_WRITE, MAP_PRIVATE | MAP_ANONYMOUS, -1, 0);
+    if (buf == MAP_FAILED) {
+        return NULL;
+    }
+    // lock the pages so they never fault or move while the device reads them
+    if (mlock(buf, nbytes) != 0) {
+        munmap(buf, nbytes);
+        return NULL;
+    }
+    return buf;
+}
+
+void gpu_free_pinned(void* buf, size_t nbytes) {
+    if (buf != NULL) {
+        munlock(buf, nbytes);
+        munmap(buf, nbytes);
+    }
 }
\ No newline at end of file
@@ -21,11 +21,67 @@ void gpu_start(gpu_device_t* dev);
 
 void gpu_stop(gpu_device_t* dev);
 
+// -- Host Memory API --
+
+// allocates a page-locked host buffer for uploads, NULL if it cannot be pinned
+void* gpu_alloc_pinned(size_t nbytes);
+
+void gpu_free_pinned(void* buf, size_t nbytes);
+
+// an opaque handle to a bump-allocated upload slab
+typedef struct gpu_pool_t gpu_pool_t;
+
+// the slab is page-locked when possible and falls back to ordinary memory
+gpu_pool_t* gpu_pool_create(size_t pool_bytes);
+
+void gpu_pool_destroy(gpu_pool_t* pool);
+
+// returns NULL once the pool is exhausted, memory is reclaimed only by gpu_pool_reset
+void* gpu_pool_alloc(gpu_pool_t* pool, size_t nbytes);
+
+void gpu_pool_reset(gpu_pool_t* pool);
+
 // -- Shader Loader API --
 
 // loads a shader program into the gpu's instruction memory
 bool gpu_load_shader(gpu_device_t* dev, const uint32_t* shader_code, size_t instruction_count);
 
+// -- Command Ring API --
+
+// commands understood by the ring worker
+typedef enum {
+    GPU_CMD_LOAD_SHADER = 1,
+    GPU_CMD_RESET       = 2,
+    GPU_CMD_START       = 3,
+    GPU_CMD_STOP        = 4,
+} gpu_cmd_op_t;
+
+// a single queued command, data must stay valid until the ring has drained
+typedef struct {
+    uint32_t op;
+    uint32_t count;
+    const uint32_t* data;
+} gpu_cmd_t;
+
+// an opaque handle to a lock-free command ring drained by a worker thread.
+// the worker takes no lock around its mmio, so while a ring is live every
+// reset/start/stop for that device must be submitted through it too
+typedef struct gpu_cmd_ring_t gpu_cmd_ring_t;
+
+gpu_cmd_ring_t* gpu_cmd_ring_create(gpu_device_t* dev);
+
+void gpu_cmd_ring_destroy(gpu_cmd_ring_t* ring);
+
+// enqueues a copy of cmd, returns false if the ring is full. the ring has a
+// single producer, so callers on more than one thread must serialise this
+bool gpu_submit_cmd(gpu_cmd_ring_t* ring, const gpu_cmd_t* cmd);
+
+// waits for every submitted command to finish, false on timeout
+bool gpu_cmd_ring_wait(gpu_cmd_ring_t* ring, uint32_t timeout_cycles);
+
+// returns and clears the number of commands that failed since the last call
+uint32_t gpu_cmd_ring_errors(gpu_cmd_ring_t* ring);
+
 // --- Status and Diagnostics API ---
 
 bool gpu_is_busy(gpu_device_t* dev);
@@ -36,4 +92,14 @@ uint32_t gpu_get_error(gpu_device_t* dev);
 
 bool gpu_wait_for_idle(gpu_device_t* dev, uint32_t timeout_cycles);
 
+// status and error read together in a single call
+typedef struct {
+    uint32_t status;
+    uint32_t error;
+    bool busy;
+} gpu_snapshot_t;
+
+// fills out in place, the error register is cleared by the read as with gpu_get_error
+void gpu_get_snapshot(gpu_device_t* dev, gpu_snapshot_t* out);
+
 #endif // GPU_DRIVER_H_
\ No newline at end of file
@@ -0,0 +1,71 @@
+#include "gpu_driver.h"
+#include <stdlib.h>
+
+// bump allocator over a single host slab for small, repeated uploads.
+// allocations are never freed one by one, the whole slab is recycled with
+// gpu_pool_reset once every command using it has completed.
+
+#define GPU_POOL_ALIGN 64 // keep each allocation on its own cache line
+
+struct gpu_pool_t {
+    uint8_t* base;
+    size_t size;
+    size_t used;
+    bool pinned;
+};
+
+// --- public api implementation ---
+
+gpu_pool_t* gpu_pool_create(size_t pool_bytes) {
+    if (pool_bytes == 0) {
+        return NULL;
+    }
+    gpu_pool_t* pool = (gpu_pool_t*)malloc(sizeof(gpu_pool_t));
+    if (pool == NULL) {
+        return NULL;
+    }
+
+    // prefer locked pages, but a plain slab still saves the per-upload allocation
+    pool->base = (uint8_t*)gpu_alloc_pinned(pool_bytes);
+    pool->pinned = pool->base != NULL;
+    if (!pool->pinned) {
+        pool->base = (uint8_t*)malloc(pool_bytes);
+        if (pool->base == NULL) {
+            free(pool);
+            return NULL;
+        }
+    }
+    pool->size = pool_bytes;
+    pool->used = 0;
+    return pool;
+}
+
+void gpu_pool_destroy(gpu_pool_t* pool) {
+    if (pool == NULL) {
+        return;
+    }
+    if (pool->pinned) {
+        gpu_free_pinned(pool->base, pool->size);
+    } else {
+        free(pool->base);
+    }
+    free(pool);
+}
+
+void* gpu_pool_alloc(gpu_pool_t* pool, size_t nbytes) {
+    if (pool == NULL || nbytes == 0) {
+        return NULL;
+    }
+    size_t offset = (pool->used + GPU_POOL_ALIGN - 1) & ~(size_t)(GPU_POOL_ALIGN - 1);
+    if (offset > pool->size || nbytes > pool->size - offset) {
+        return NULL; // pool exhausted until the next reset
+    }
+    pool->used = offset + nbytes;
+    return pool->base + offset;
+}
+
+void gpu_pool_reset(gpu_pool_t* pool) {
+    if (pool != NULL) {
+        pool->used = 0;
+    }
+}
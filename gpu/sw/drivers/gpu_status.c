@@ -44,4 +44,20 @@ bool gpu_wait_for_idle(gpu_device_t* dev, uint32_t timeout_cycles) {
         }
     }
     return true; // became idle
+}
+
+void gpu_get_snapshot(gpu_device_t* dev, gpu_snapshot_t* out) {
+    if (out == NULL) {
+        return;
+    }
+    if (dev == NULL) {
+        out->status = 0;
+        out->error = GPU_ERROR_NONE;
+        out->busy = false;
+        return;
+    }
+    out->status = gpu_reg_read(dev, GPU_REG_STATUS);
+    // reading the error register also clears it on the hardware side
+    out->error = gpu_reg_read(dev, GPU_REG_ERROR);
+    out->busy = (out->status & GPU_STATUS_BUSY_MASK) != 0;
 }
\ No newline at end of file
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+# cffi abi-mode binding for libgpudriver.so, the one handle shared by controller.py and loader.py.
+# the cdef mirrors drivers/gpu_driver.h, keep the two in sync.
+
+import cffi
+
+ffi = cffi.FFI()
+ffi.cdef("""
+    typedef struct gpu_device_t gpu_device_t;
+
+    gpu_device_t* gpu_init(uintptr_t base_addr);
+    void gpu_destroy(gpu_device_t* dev);
+    void gpu_reset(gpu_device_t* dev);
+    void gpu_start(gpu_device_t* dev);
+    void gpu_stop(gpu_device_t* dev);
+
+    void* gpu_alloc_pinned(size_t nbytes);
+    void gpu_free_pinned(void* buf, size_t nbytes);
+
+    typedef struct gpu_pool_t gpu_pool_t;
+
+    gpu_pool_t* gpu_pool_create(size_t pool_bytes);
+    void gpu_pool_destroy(gpu_pool_t* pool);
+    void* gpu_pool_alloc(gpu_pool_t* pool, size_t nbytes);
+    void gpu_pool_reset(gpu_pool_t* pool);
+
+    bool gpu_load_shader(gpu_device_t* dev, const uint32_t* shader_code, size_t instruction_count);
+
+    typedef enum {
+        GPU_CMD_LOAD_SHADER = 1,
+        GPU_CMD_RESET       = 2,
+        GPU_CMD_START       = 3,
+        GPU_CMD_STOP        = 4,
+    } gpu_cmd_op_t;
+
+    typedef struct {
+        uint32_t op;
+        uint32_t count;
+        const uint32_t* data;
+    } gpu_cmd_t;
+
+    typedef struct gpu_cmd_ring_t gpu_cmd_ring_t;
+
+    gpu_cmd_ring_t* gpu_cmd_ring_create(gpu_device_t* dev);
+    void gpu_cmd_ring_destroy(gpu_cmd_ring_t* ring);
+    bool gpu_submit_cmd(gpu_cmd_ring_t* ring, const gpu_cmd_t* cmd);
+    bool gpu_cmd_ring_wait(gpu_cmd_ring_t* ring, uint32_t timeout_cycles);
+    uint32_t gpu_cmd_ring_errors(gpu_cmd_ring_t* ring);
+
+    bool gpu_is_busy(gpu_device_t* dev);
+    uint32_t gpu_get_status(gpu_device_t* dev);
+    uint32_t gpu_get_error(gpu_device_t* dev);
+    bool gpu_wait_for_idle(gpu_device_t* dev, uint32_t timeout_cycles);
+
+    typedef struct {
+        uint32_t status;
+        uint32_t error;
+        bool busy;
+    } gpu_snapshot_t;
+
+    void gpu_get_snapshot(gpu_device_t* dev, gpu_snapshot_t* out);
+""")
+
+try:
+    gpu_lib = ffi.dlopen('./libgpudriver.so')
+except OSError as e:
+    print(f"error: could not load gpu driver library. did you compile it?")
+    print(f"details: {e}")
+    exit(1)
+
+# resolve every entry point once, callers import these names and skip the lib lookup per call
+gpu_init = gpu_lib.gpu_init
+gpu_destroy = gpu_lib.gpu_destroy
+gpu_reset = gpu_lib.gpu_reset
+gpu_start = gpu_lib.gpu_start
+gpu_stop = gpu_lib.gpu_stop
+gpu_alloc_pinned = gpu_lib.gpu_alloc_pinned
+gpu_free_pinned = gpu_lib.gpu_free_pinned
+gpu_pool_create = gpu_lib.gpu_pool_create
+gpu_pool_destroy = gpu_lib.gpu_pool_destroy
+gpu_pool_alloc = gpu_lib.gpu_pool_alloc
+gpu_pool_reset = gpu_lib.gpu_pool_reset
+gpu_load_shader = gpu_lib.gpu_load_shader
+gpu_cmd_ring_create = gpu_lib.gpu_cmd_ring_create
+gpu_cmd_ring_destroy = gpu_lib.gpu_cmd_ring_destroy
+gpu_submit_cmd = gpu_lib.gpu_submit_cmd
+gpu_cmd_ring_wait = gpu_lib.gpu_cmd_ring_wait
+gpu_cmd_ring_errors = gpu_lib.gpu_cmd_ring_errors
+gpu_is_busy = gpu_lib.gpu_is_busy
+gpu_get_status = gpu_lib.gpu_get_status
+gpu_get_error = gpu_lib.gpu_get_error
+gpu_wait_for_idle = gpu_lib.gpu_wait_for_idle
+gpu_get_snapshot = gpu_lib.gpu_get_snapshot
+
+GPU_CMD_LOAD_SHADER = gpu_lib.GPU_CMD_LOAD_SHADER
+GPU_CMD_RESET = gpu_lib.GPU_CMD_RESET
+GPU_CMD_START = gpu_lib.GPU_CMD_START
+GPU_CMD_STOP = gpu_lib.GPU_CMD_STOP
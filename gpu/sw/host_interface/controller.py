@@ -1,70 +1,191 @@
 #!/usr/bin/env python3
 
-import ctypes
+import mmap
+import os
+import threading
 import time
+import weakref
 
-try:
-    gpu_lib = ctypes.CDLL('./libgpudriver.so')
-except OSError as e:
-    print(f"error: could not load gpu driver library. did you compile it?")
-    print(f"details: {e}")
-    exit(1)
-
-class GpuDevice(ctypes.Structure):
-    pass
-
-gpu_lib.gpu_init.argtypes = [ctypes.c_uint64]
-gpu_lib.gpu_init.restype = ctypes.POINTER(GpuDevice)
-gpu_lib.gpu_destroy.argtypes = [ctypes.POINTER(GpuDevice)]
-gpu_lib.gpu_reset.argtypes = [ctypes.POINTER(GpuDevice)]
-gpu_lib.gpu_start.argtypes = [ctypes.POINTER(GpuDevice)]
-gpu_lib.gpu_stop.argtypes = [ctypes.POINTER(GpuDevice)]
-gpu_lib.gpu_get_status.argtypes = [ctypes.POINTER(GpuDevice)]
-gpu_lib.gpu_get_status.restype = ctypes.c_uint32
-gpu_lib.gpu_get_error.argtypes = [ctypes.POINTER(GpuDevice)]
-gpu_lib.gpu_get_error.restype = ctypes.c_uint32
-gpu_lib.gpu_is_busy.argtypes = [ctypes.POINTER(GpuDevice)]
-gpu_lib.gpu_is_busy.restype = ctypes.c_bool
-gpu_lib.gpu_wait_for_idle.argtypes = [ctypes.POINTER(GpuDevice), ctypes.c_uint32]
-gpu_lib.gpu_wait_for_idle.restype = ctypes.c_bool
+from _driver import (
+    ffi, gpu_init, gpu_destroy,
+    gpu_get_status, gpu_get_error, gpu_get_snapshot, gpu_cmd_ring_create, gpu_cmd_ring_destroy,
+    gpu_submit_cmd, gpu_cmd_ring_wait, gpu_cmd_ring_errors, gpu_pool_create, gpu_pool_destroy,
+    gpu_pool_alloc, gpu_pool_reset, GPU_CMD_LOAD_SHADER, GPU_CMD_RESET, GPU_CMD_START,
+    GPU_CMD_STOP,
+)
+
+# register layout, mirrors drivers/gpu_regs.h
+GPU_REG_STATUS = 0x04
+GPU_STATUS_BUSY_MASK = 1 << 0
+GPU_REG_WINDOW = 0x20
+
+# slab that queued uploads are copied into, recycled every time the ring drains
+SHADER_POOL_BYTES = 16 * 1024 * 1024
+
+
+def _release(ring, pool, dev):
+    # must not reference the controller, weakref.finalize runs it after the object is gone.
+    # the ring drains before the pool its commands point into is freed
+    gpu_cmd_ring_destroy(ring)
+    gpu_pool_destroy(pool)
+    gpu_destroy(dev)
 
 
 class GPUController:
-    def __init__(self, base_addr: int):
-        self.dev = gpu_lib.gpu_init(base_addr)
+    def __init__(self, base_addr: int, mem_path: str = None):
+        # map the register window once so status polling is a plain memory read in python.
+        # with mem_path (e.g. /dev/mem) we map it ourselves and give the driver the mapped
+        # address, otherwise base_addr is taken to be directly addressable already
+        self.dev = None
+        self._regs = None
+        self._mm = None
+        if mem_path:
+            fd = os.open(mem_path, os.O_RDWR | os.O_SYNC)
+            try:
+                self._mm = mmap.mmap(fd, mmap.PAGESIZE, offset=base_addr)
+            finally:
+                os.close(fd)
+            regs = self._mm
+            dev_addr = int(ffi.cast('uintptr_t', ffi.from_buffer(self._mm)))
+        else:
+            regs = ffi.buffer(ffi.cast('uint32_t *', base_addr), GPU_REG_WINDOW)
+            dev_addr = base_addr
+        # 'I' indexing does one 32-bit load per access, which is what the mmio needs
+        self._regs = memoryview(regs).cast('B').cast('I')
+
+        self.dev = gpu_init(dev_addr)
         if not self.dev:
             raise RuntimeError("gpu_init failed. could not create device handle.")
+
+        self.ring = gpu_cmd_ring_create(self.dev)
+        if not self.ring:
+            gpu_destroy(self.dev)
+            self.dev = None
+            raise RuntimeError("gpu_cmd_ring_create failed. could not start command worker.")
+
+        self._pool = gpu_pool_create(SHADER_POOL_BYTES)
+        if not self._pool:
+            gpu_cmd_ring_destroy(self.ring)
+            gpu_destroy(self.dev)
+            self.dev = None
+            raise RuntimeError("gpu_pool_create failed. could not allocate upload pool.")
+
+        # one descriptor reused for every submit, the ring copies it on enqueue
+        self._cmd = ffi.new('gpu_cmd_t *')
+        # the ring only takes one producer and cffi drops the gil during the call, so
+        # threads sharing a controller take turns on _cmd, the pool and gpu_submit_cmd
+        self._submit_lock = threading.Lock()
+        # filled in place by get_snapshot
+        self._snapshot = ffi.new('gpu_snapshot_t *')
+        # frees the handles if the controller is dropped without close()
+        self._finalizer = weakref.finalize(self, _release, self.ring, self._pool, self.dev)
         print(f"gpu controller initialized at address 0x{base_addr:08x}.")
 
-    def __del__(self):
-        if self.dev:
-            gpu_lib.gpu_destroy(self.dev)
+    def close(self):
+        if self._finalizer.alive:
+            self._finalizer()
             print("gpu controller shut down.")
+        self.dev = None
+        self.ring = None
+        self._pool = None
+        if self._regs is not None:
+            self._regs.release()
+            self._regs = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _run_control(self, op, timeout_s: float = 1.0):
+        # control writes go through the ring as well, so the worker is the only thread
+        # touching the mmio and a reset can't land in the middle of a queued upload. it
+        # runs after anything already queued, and waiting for the drain keeps these calls
+        # synchronous like the direct driver calls were
+        timeout_cycles = int(timeout_s * 100_000_000)
+        with self._submit_lock:
+            self._cmd.op = op
+            self._cmd.count = 0
+            self._cmd.data = ffi.NULL
+            if not gpu_submit_cmd(self.ring, self._cmd):
+                # ring full, let the queued commands finish and retry once
+                if not gpu_cmd_ring_wait(self.ring, timeout_cycles) or not gpu_submit_cmd(self.ring, self._cmd):
+                    raise RuntimeError("command ring full. could not queue control command.")
+        if not gpu_cmd_ring_wait(self.ring, timeout_cycles):
+            raise RuntimeError("timed out waiting for the command worker.")
 
     def reset(self):
         print("sending reset command...")
-        gpu_lib.gpu_reset(self.dev)
+        self._run_control(GPU_CMD_RESET)
 
     def start(self):
         print("sending start command...")
-        gpu_lib.gpu_start(self.dev)
+        self._run_control(GPU_CMD_START)
 
     def stop(self):
         print("sending stop command...")
-        gpu_lib.gpu_stop(self.dev)
+        self._run_control(GPU_CMD_STOP)
 
     def is_busy(self) -> bool:
-        return gpu_lib.gpu_is_busy(self.dev)
+        return (self._regs[GPU_REG_STATUS // 4] & GPU_STATUS_BUSY_MASK) != 0
 
     def get_status_reg(self) -> int:
-        return gpu_lib.gpu_get_status(self.dev)
+        return gpu_get_status(self.dev)
         
     def get_error_code(self) -> int:
-        return gpu_lib.gpu_get_error(self.dev)
+        return gpu_get_error(self.dev)
+
+    def get_snapshot(self):
+        # status, error and busy in one driver call. the returned struct is reused by the
+        # next call, and the read clears the error register like get_error_code does
+        gpu_get_snapshot(self.dev, self._snapshot)
+        return self._snapshot
         
     def wait_for_idle(self, timeout_s: float = 1.0) -> bool:
+        # spin on the mapped status register, no driver call per iteration
+        regs = self._regs
+        status_idx = GPU_REG_STATUS // 4
+        deadline = time.monotonic_ns() + int(timeout_s * 1_000_000_000)
+        while regs[status_idx] & GPU_STATUS_BUSY_MASK:
+            if time.monotonic_ns() > deadline:
+                return False
+        return True
+
+    def submit_shader(self, instructions) -> bool:
+        # queues the upload and returns straight away, instructions must be a uint32 buffer
+        # such as the array returned by loader.parse_intel_hex. the words are copied into the
+        # upload pool, so the caller may reuse its buffer immediately. returns false when the
+        # ring or pool is full, wait_for_commands frees both
+        c_instr_array = ffi.from_buffer('uint32_t[]', instructions)
+        count = len(c_instr_array)
+        if count == 0:
+            return True
+
+        with self._submit_lock:
+            buf = gpu_pool_alloc(self._pool, count * 4)
+            if buf == ffi.NULL:
+                return False
+            ffi.memmove(buf, c_instr_array, count * 4)
+
+            self._cmd.op = GPU_CMD_LOAD_SHADER
+            self._cmd.count = count
+            self._cmd.data = ffi.cast('uint32_t *', buf)
+            return gpu_submit_cmd(self.ring, self._cmd)
+
+    def wait_for_commands(self, timeout_s: float = 1.0) -> bool:
         timeout_cycles = int(timeout_s * 100_000_000)
-        return gpu_lib.gpu_wait_for_idle(self.dev, timeout_cycles)
+        # held across the drain and the pool reset so no other thread queues an upload
+        # into the pool in between
+        with self._submit_lock:
+            if not gpu_cmd_ring_wait(self.ring, timeout_cycles):
+                return False
+            # nothing is queued any more, so the whole pool can be handed out again
+            gpu_pool_reset(self._pool)
+        return gpu_cmd_ring_errors(self.ring) == 0
 
 
 def main():
@@ -74,23 +195,23 @@ def main():
         print(f"error: {e}")
         return
 
-    gpu.reset()
-    
-    gpu.start()
-    
-    print("gpu is running... waiting for it to go idle.")
-    time.sleep(0.5)
-    
-    if gpu.wait_for_idle(timeout_s=1.0):
-        print("gpu is now idle.")
-    else:
-        print("gpu timed out waiting for idle.")
-
-    status = gpu.get_status_reg()
-    error = gpu.get_error_code()
-    
-    print(f"final status register: 0x{status:08x}")
-    print(f"final error code: 0x{error:02x}")
+    with gpu:
+        gpu.reset()
+
+        gpu.start()
+
+        print("gpu is running... waiting for it to go idle.")
+        time.sleep(0.5)
+
+        if gpu.wait_for_idle(timeout_s=1.0):
+            print("gpu is now idle.")
+        else:
+            print("gpu timed out waiting for idle.")
+
+        snapshot = gpu.get_snapshot()
+
+        print(f"final status register: 0x{snapshot.status:08x}")
+        print(f"final error code: 0x{snapshot.error:02x}")
 
 
 if __name__ == "__main__":
@@ -1,72 +1,87 @@
 #!/usr/bin/env python3
 
-import ctypes
 import argparse
-from typing import List
-
-try:
-    gpu_lib = ctypes.CDLL('./libgpudriver.so')
-except OSError as e:
-    print(f"error: could not load gpu driver library. did you compile it?")
-    print(f"details: {e}")
-    exit(1)
-
-class GpuDevice(ctypes.Structure):
-    pass
+import binascii
+import re
+import sys
+from array import array
+
+from _driver import (
+    ffi, gpu_init, gpu_reset, gpu_load_shader, gpu_destroy, gpu_alloc_pinned, gpu_free_pinned,
+)
+
+# page-locked upload buffer, allocated on first use and only regrown for a larger shader
+_SCRATCH_MIN_BYTES = 64 * 1024
+_shader_scratch = None
+_shader_scratch_bytes = 0
+
+
+# matches every non-blank line, group 1 is the hex body of a record and group 2 is anything else
+_RECORD_RE = re.compile(rb'^[ \t\r]*(?::([0-9A-Fa-f]*)|(\S[^\r\n]*?))[ \t\r]*$', re.MULTILINE)
+
+def _line_of(data: bytes, pos: int) -> int:
+    # only needed for error messages, so it is not tracked during the scan
+    return data.count(b'\n', 0, pos) + 1
+
+def parse_intel_hex(file_path: str) -> array:
+    with open(file_path, 'rb') as f:
+        data = f.read()
+
+    # scan and decode every record up to end-of-file, checksums are verified afterwards in bulk
+    records = []
+    offsets = []
+    for match in _RECORD_RE.finditer(data):
+        record_hex, other = match.groups()
+        if other is not None:
+            line_num = _line_of(data, match.start())
+            if other.startswith(b':'):
+                raise ValueError(f"line {line_num} contains non-hex characters.")
+            raise ValueError(f"line {line_num} does not start with ':'")
+
+        if len(record_hex) < 10 or len(record_hex) % 2:
+            raise ValueError(f"line {_line_of(data, match.start())} has inconsistent byte count.")
+
+        hex_data = binascii.unhexlify(record_hex)
+        if len(hex_data) - 5 != hex_data[0]:
+            raise ValueError(f"line {_line_of(data, match.start())} has inconsistent byte count.")
+
+        records.append(hex_data)
+        offsets.append(match.start())
+        if hex_data[3] == 0x01:
+            break
 
-gpu_lib.gpu_init.argtypes = [ctypes.c_uint64]
-gpu_lib.gpu_init.restype = ctypes.POINTER(GpuDevice)
+    # a valid record sums to zero including its checksum byte. map keeps the whole sweep in c
+    for index, total in enumerate(map(sum, records)):
+        if total & 0xFF:
+            raise ValueError(f"line {_line_of(data, offsets[index])} has a checksum error.")
 
-gpu_lib.gpu_load_shader.argtypes = [ctypes.POINTER(GpuDevice), ctypes.POINTER(ctypes.c_uint32), ctypes.c_size_t]
-gpu_lib.gpu_load_shader.restype = ctypes.c_bool
+    raw_bytes = b''.join([rec[4:-1] for rec in records if rec[3] == 0x00])
 
-gpu_lib.gpu_reset.argtypes = [ctypes.POINTER(GpuDevice)]
-gpu_lib.gpu_destroy.argtypes = [ctypes.POINTER(GpuDevice)]
+    trailing = len(raw_bytes) % 4
+    if trailing:
+        print(f"warning: trailing {trailing} bytes in hex file will be ignored.")
+        raw_bytes = raw_bytes[:-trailing]
 
+    # words are stored little-endian, convert the whole payload in one copy
+    instructions = array('I', raw_bytes)
+    if sys.byteorder != 'little':
+        instructions.byteswap()
 
-def parse_intel_hex(file_path: str) -> List[int]:
-    raw_bytes = bytearray()
-    
-    with open(file_path, 'r') as f:
-        for line_num, line in enumerate(f, 1):
-            line = line.strip()
-            if not line:
-                continue
-            
-            if line[0] != ':':
-                raise ValueError(f"line {line_num} does not start with ':'")
-            
-            hex_data = bytes.fromhex(line[1:])
-            
-            byte_count = hex_data[0]
-            address = int.from_bytes(hex_data[1:3], 'big')
-            record_type = hex_data[3]
-            data = hex_data[4:-1]
-            checksum = hex_data[-1]
-
-            if len(data) != byte_count:
-                raise ValueError(f"line {line_num} has inconsistent byte count.")
-
-            calc_checksum = (sum(hex_data[:-1])) & 0xFF
-            if ((calc_checksum + checksum) & 0xFF) != 0:
-                raise ValueError(f"line {line_num} has a checksum error.")
-
-            if record_type == 0x00:
-                raw_bytes.extend(data)
-            elif record_type == 0x01:
-                break
-    
-    instructions = []
-    for i in range(0, len(raw_bytes), 4):
-        word_bytes = raw_bytes[i:i+4]
-        if len(word_bytes) < 4:
-            print(f"warning: trailing {len(word_bytes)} bytes in hex file will be ignored.")
-            break
-        instructions.append(int.from_bytes(word_bytes, 'little'))
-        
     return instructions
 
-def load_shader_from_file(dev: ctypes.POINTER(GpuDevice), hex_file_path: str) -> bool:
+def _get_shader_scratch(nbytes: int):
+    global _shader_scratch, _shader_scratch_bytes
+    if _shader_scratch is None or _shader_scratch_bytes < nbytes:
+        size = max(nbytes, _SCRATCH_MIN_BYTES, 2 * _shader_scratch_bytes)
+        buf = gpu_alloc_pinned(size)
+        if buf == ffi.NULL:
+            return None
+        # the old buffer, if any, is unmapped when its cdata is collected
+        _shader_scratch = ffi.gc(ffi.cast('uint32_t *', buf), lambda p, n=size: gpu_free_pinned(p, n))
+        _shader_scratch_bytes = size
+    return _shader_scratch
+
+def load_shader_from_file(dev, hex_file_path: str) -> bool:
     print(f"loading shader from '{hex_file_path}'...")
     
     try:
@@ -83,11 +98,17 @@ def load_shader_from_file(dev: ctypes.POINTER(GpuDevice), hex_file_path: str) ->
         return True
 
     instr_count = len(instructions)
-    c_instr_array = (ctypes.c_uint32 * instr_count)(*instructions)
+    # the parser already hands back a uint32 buffer, copy it into the reusable pinned
+    # scratch in one memmove. if pages cannot be locked, pass a view of it as is
+    c_instr_array = ffi.from_buffer('uint32_t[]', instructions)
+    scratch = _get_shader_scratch(instr_count * 4)
+    if scratch is not None:
+        ffi.memmove(scratch, c_instr_array, instr_count * 4)
+        c_instr_array = scratch
 
     print(f"parsed {instr_count} instructions. sending to gpu...")
     
-    success = gpu_lib.gpu_load_shader(dev, c_instr_array, instr_count)
+    success = gpu_load_shader(dev, c_instr_array, instr_count)
     
     if success:
         print("shader loaded successfully.")
@@ -104,17 +125,17 @@ def main():
     args = parser.parse_args()
 
     print(f"initializing gpu at base address 0x{args.base_addr:08x}...")
-    dev = gpu_lib.gpu_init(args.base_addr)
+    dev = gpu_init(args.base_addr)
     if not dev:
         print("error: gpu_init failed. unable to create device handle.")
         return
 
     print("resetting gpu...")
-    gpu_lib.gpu_reset(dev)
+    gpu_reset(dev)
     
     load_shader_from_file(dev, args.shader_file)
 
-    gpu_lib.gpu_destroy(dev)
+    gpu_destroy(dev)
     print("done.")
 
 if __name__ == "__main__":
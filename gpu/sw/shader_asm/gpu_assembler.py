@@ -2,25 +2,105 @@
 
 import sys
 import argparse
+import binascii
+from array import array
 from typing import List, Dict, Tuple
 
 from isa_constants import OPCODES, REGISTERS
 
-# this is simple two pass assembler for the isa.
+# this is simple single pass assembler for the isa. labels used before they are
+# defined get a zero field and are patched once the whole source has been read.
+
+IMM_MASK = 0x7FFFF       # 19-bit immediate / branch offset field
+TARGET_MASK = 0x7FFFFFF  # 27-bit absolute jump target
+
+def _parse_imm(s: str) -> int:
+    # same literals as int(s, 0) for our syntax, but the base is picked from the prefix
+    # once so int() does not have to scan for it on every immediate
+    body = s[1:] if s[0] in '+-' else s
+    prefix = body[:2]
+    if prefix == '0x':
+        return int(s, 16)
+    if prefix == '0b':
+        return int(s, 2)
+    if prefix == '0o':
+        return int(s, 8)
+    return int(s, 10)
+
+def _make_encoder(mnemonic: str, opcode_val: int, instr_type: str, regs: Dict[str, int] = REGISTERS):
+    # builds the encoder for one mnemonic with its opcode bits already in place. regs is
+    # bound by closure so the hot path never touches a module global. label operands that
+    # are not defined yet are recorded in fixups as (instruction index, label, pc_relative)
+    # and left as zero in the word
+    base = opcode_val << 27
+
+    # special case for jumpl to have a natural rs1, rs2 order
+    if mnemonic == 'jumpl':
+        def encode(operands, symbols, current_address, fixups):
+            rs1 = regs[operands[0]]
+            rs2 = regs[operands[1]]
+            imm_str = operands[2]
+
+            # pc-relative jump for branches
+            if imm_str in symbols:
+                imm = symbols[imm_str] - (current_address + 4)
+            else:
+                try:
+                    imm = _parse_imm(imm_str)
+                except ValueError:
+                    fixups.append((current_address // 4, imm_str, True))
+                    imm = 0
+
+            # note: for jumpl, we use the 'rd' field to hold rs2
+            return base | (rs2 << 23) | (rs1 << 19) | (imm & IMM_MASK)
+
+    elif instr_type == 'r_type':
+        def encode(operands, symbols, current_address, fixups):
+            return base | (regs[operands[0]] << 23) | (regs[operands[1]] << 19) | (regs[operands[2]] << 15)
+
+    elif instr_type == 'i_type':
+        def encode(operands, symbols, current_address, fixups):
+            imm = _parse_imm(operands[2])
+            return base | (regs[operands[0]] << 23) | (regs[operands[1]] << 19) | (imm & IMM_MASK)
+
+    elif instr_type == 's_type':
+        # rs2 sits in the rd field
+        def encode(operands, symbols, current_address, fixups):
+            imm = _parse_imm(operands[2])
+            return base | (regs[operands[0]] << 23) | (regs[operands[1]] << 19) | (imm & IMM_MASK)
+
+    elif instr_type == 'j_type':
+        def encode(operands, symbols, current_address, fixups):
+            target = operands[0]
+            if target not in symbols:
+                fixups.append((current_address // 4, target, False))
+                return base
+            return base | (symbols[target] & TARGET_MASK)
+
+    else:
+        raise ValueError(f"unknown instruction type '{instr_type}' for '{mnemonic}'")
+
+    return encode
+
+# mnemonic -> encoder, built once so each instruction costs a single dict lookup
+DISPATCH = {mnem: _make_encoder(mnem, opc, itype) for mnem, (opc, itype) in OPCODES.items()}
+
+def assemble(source_lines: List[str]) -> Tuple[array, Dict[str, int]]:
+    _DISPATCH = DISPATCH
 
-def assemble(source_lines: List[str]) -> Tuple[List[int], Dict[str, int]]:
-    # pass 1, build symbol table for labels
     symbols: Dict[str, int] = {}
-    instructions: List[Tuple[str, List[str]]] = []
-    
+    fixups: List[Tuple[int, str, bool]] = []
+    # packed uint32 storage, the hex writer copies records straight out of it
+    machine_code = array('I')
+    append = machine_code.append
+
     current_address = 0
     for line_num, line in enumerate(source_lines, 1):
-        line = line.split('//')[0].strip().lower()
-        if not line:
+        # split() already drops surrounding whitespace, so no strip() before it
+        parts = line.split('//', 1)[0].lower().replace(',', ' ').split()
+        if not parts:
             continue
 
-        parts = line.replace(',', ' ').split()
-        
         if parts[0].endswith(':'):
             label = parts[0][:-1]
             if label in symbols:
@@ -31,84 +111,49 @@ def assemble(source_lines: List[str]) -> Tuple[List[int], Dict[str, int]]:
         if not parts:
             continue
 
-        instructions.append((parts[0], parts[1:]))
-        current_address += 4
-
-    # pass 2, encode instructions into machine code
-    machine_code: List[int] = []
-    current_address = 0
-    for mnemonic, operands in instructions:
-        if mnemonic not in OPCODES:
+        mnemonic = parts[0]
+        encode = _DISPATCH.get(mnemonic)
+        if encode is None:
             raise ValueError(f"unknown mnemonic '{mnemonic}'")
-        
-        opcode_val, instr_type = OPCODES[mnemonic]
-        word = opcode_val << 27
-        
-        # special case for jumpl to have a natural rs1, rs2 order
-        if mnemonic == 'jumpl':
-            rs1 = REGISTERS[operands[0]]
-            rs2 = REGISTERS[operands[1]]
-            imm_str = operands[2]
-            
-            # pc-relative jump for branches
-            imm = symbols[imm_str] - (current_address + 4) if imm_str in symbols else int(imm_str, 0)
-            
-            # note: for jumpl, we use the 'rd' field to hold rs2
-            word |= (rs2 << 23) | (rs1 << 19) | (imm & 0x7FFFF)
 
-        elif instr_type == 'r_type':
-            rd = REGISTERS[operands[0]]
-            rs1 = REGISTERS[operands[1]]
-            rs2 = REGISTERS[operands[2]]
-            word |= (rd << 23) | (rs1 << 19) | (rs2 << 15)
-        
-        elif instr_type == 'i_type':
-            rd = REGISTERS[operands[0]]
-            rs1 = REGISTERS[operands[1]]
-            imm = int(operands[2], 0)
-            word |= (rd << 23) | (rs1 << 19) | (imm & 0x7FFFF)
-
-        elif instr_type == 's_type':
-            rs2 = REGISTERS[operands[0]]
-            rs1 = REGISTERS[operands[1]]
-            imm = int(operands[2], 0)
-            word |= (rs2 << 23) | (rs1 << 19) | (imm & 0x7FFFF)
-
-        elif instr_type == 'j_type':
-            target = operands[0]
-            if target not in symbols:
-                raise ValueError(f"undefined label '{target}'")
-            addr = symbols[target]
-            word |= (addr & 0x7FFFFFF)
-
-        machine_code.append(word)
+        append(encode(parts[1:], symbols, current_address, fixups))
         current_address += 4
 
+    # patch forward references now that every label is known
+    for index, label, pc_relative in fixups:
+        if label not in symbols:
+            raise ValueError(f"undefined label '{label}'")
+        if pc_relative:
+            machine_code[index] |= (symbols[label] - (index * 4 + 4)) & IMM_MASK
+        else:
+            machine_code[index] |= symbols[label] & TARGET_MASK
+
     return machine_code, symbols
 
 def write_intel_hex(words: List[int], file_path: str):
-    with open(file_path, 'w') as f:
-        address = 0
-        for i in range(0, len(words), 4):
-            chunk = words[i:i+4]
-            byte_count = len(chunk) * 4
-            record_type = 0x00
-            
-            record_str = f"{byte_count:02X}{address:04X}{record_type:02X}"
-            
-            data_bytes = bytearray()
-            for word in chunk:
-                data_bytes.extend(word.to_bytes(4, 'little'))
+    if not (isinstance(words, array) and words.typecode == 'I'):
+        words = array('I', words)
+    if sys.byteorder != 'little':
+        words = array('I', words)
+        words.byteswap()
 
-            record_str += "".join(f"{b:02X}" for b in data_bytes)
-            
-            checksum = sum(bytearray.fromhex(record_str)) & 0xFF
-            checksum = (256 - checksum) & 0xFF
-            
-            f.write(f":{record_str}{checksum:02X}\n")
-            address += byte_count
-            
-        f.write(":00000001FF\n")
+    records = []
+    address = 0
+    for i in range(0, len(words), 4):
+        data_bytes = words[i:i+4].tobytes()
+        byte_count = len(data_bytes)
+        record_type = 0x00
+
+        body = bytes([byte_count, (address >> 8) & 0xFF, address & 0xFF, record_type]) + data_bytes
+        checksum = (-sum(body)) & 0xFF
+
+        records.append(':' + binascii.hexlify(body + bytes([checksum])).decode('ascii').upper() + '\n')
+        address += byte_count
+
+    records.append(":00000001FF\n")
+
+    with open(file_path, 'w') as f:
+        f.write(''.join(records))
 
 def main():
     parser = argparse.ArgumentParser(description="assemble custom gpu code to intel hex.")
@@ -1,6 +1,7 @@
 # tb/alu_tb.py
 import cocotb
 import random
+import numpy as np
 from cocotb.triggers import Timer
 
 @cocotb.test()
@@ -9,20 +10,32 @@ async def test_alu(dut):
     vector_size = int(dut.VECTOR_SIZE.value)
     MAXVAL = (1 << data_width) - 1
 
-    def pack(vec):
-        return sum((int(v) & MAXVAL) << (i * data_width) for i, v in enumerate(vec))
+    SHIFTS = tuple(i * data_width for i in range(vector_size))
+    bus_bytes = (data_width * vector_size + 7) // 8
 
-    def unpack(bits):
-        return [(bits >> (i * data_width)) & MAXVAL for i in range(vector_size)]
+    # numpy carries lanes up to 32 bits, uint64 still holds a full product.
+    # wider lanes stay python ints, the lane width sets the wrap, not 2^64
+    wide = data_width > 32
 
-    def add_w(a, b):
-        return (a + b) & MAXVAL
+    if data_width in (8, 16, 32):
+        # byte aligned lanes, let numpy lay the bus out and convert it in one call
+        lane_dtype = np.dtype(f"<u{data_width // 8}")
 
-    def sub_w(a, b):
-        return (a - b) & MAXVAL
+        def pack(vec):
+            return int.from_bytes(np.asarray(vec).astype(lane_dtype).tobytes(), "little")
 
-    def mul_w(a, b):
-        return (a * b) & MAXVAL
+        def unpack(bits):
+            return np.frombuffer(bits.to_bytes(bus_bytes, "little"), dtype=lane_dtype).astype(np.uint64)
+    else:
+        def pack(vec):
+            acc = 0
+            for v, s in zip(vec, SHIFTS):
+                acc |= (int(v) & MAXVAL) << s
+            return acc
+
+        def unpack(bits):
+            lanes = [(bits >> s) & MAXVAL for s in SHIFTS]
+            return lanes if wide else np.array(lanes, dtype=np.uint64)
 
     valid_opcodes = [
         0b00001,  # add
@@ -36,13 +49,52 @@ async def test_alu(dut):
     ]
     test_opcodes = valid_opcodes + [0b00000]
 
+    mask = MAXVAL if wide else np.uint64(MAXVAL)
+
+    # golden model. on numpy arrays each entry computes all lanes of all matching
+    # iterations at once, on python ints it is applied lane by lane
+    golden = {
+        0b00001: lambda a, b: (a + b) & mask,
+        0b00010: lambda a, b: (a - b) & mask,
+        0b00011: lambda a, b: (a * b) & mask,
+        0b01001: lambda a, b: a & b,
+        0b01010: lambda a, b: a | b,
+        0b01011: lambda a, b: a ^ b,
+        0b10001: lambda a, b: a,
+        0b10010: lambda a, b: b,
+    }
+
     dut._log.info("---- ALU TEST STARTS HERE ----")
     num_iterations = 10_000
 
+    # draw every stimulus up front, seeded from cocotb's seed so runs stay reproducible
+    rng = np.random.default_rng(random.getrandbits(64))
+    opcodes = rng.choice(test_opcodes, size=num_iterations)
+    if not wide:
+        ops_a = rng.integers(0, MAXVAL, size=(num_iterations, vector_size), dtype=np.uint64, endpoint=True)
+        ops_b = rng.integers(0, MAXVAL, size=(num_iterations, vector_size), dtype=np.uint64, endpoint=True)
+
+        expected_all = np.zeros_like(ops_a)  # unknown opcodes produce zero
+        for opc, fn in golden.items():
+            sel = opcodes == opc
+            expected_all[sel] = fn(ops_a[sel], ops_b[sel])
+    else:
+        getrandbits = random.getrandbits
+        ops_a = [[getrandbits(data_width) for _ in range(vector_size)] for _ in range(num_iterations)]
+        ops_b = [[getrandbits(data_width) for _ in range(vector_size)] for _ in range(num_iterations)]
+
+        zero = lambda a, b: 0  # unknown opcodes produce zero
+        expected_all = [[golden.get(opc, zero)(a, b) for a, b in zip(row_a, row_b)]
+                        for opc, row_a, row_b in zip(opcodes.tolist(), ops_a, ops_b)]
+
+    # plain ints for the per-iteration drive, avoids a numpy scalar conversion each pass
+    opcode_list = opcodes.tolist()
+
     for i in range(num_iterations):
-        opcode = random.choice(test_opcodes)
-        op_a = [random.randint(0, MAXVAL) for _ in range(vector_size)]
-        op_b = [random.randint(0, MAXVAL) for _ in range(vector_size)]
+        opcode = opcode_list[i]
+        op_a = ops_a[i]
+        op_b = ops_b[i]
+        expected = expected_all[i]
 
         dut.i_opcode.value = opcode
         dut.i_operand_a.value = pack(op_a)
@@ -52,39 +104,14 @@ async def test_alu(dut):
 
         dut_result = unpack(int(dut.o_result.value))
 
-        expected = []
-        for j in range(vector_size):
-            a = op_a[j]
-            b = op_b[j]
-            if opcode == 0b00001:
-                val = add_w(a, b)
-            elif opcode == 0b00010:
-                val = sub_w(a, b)
-            elif opcode == 0b00011:
-                val = mul_w(a, b)
-            elif opcode == 0b01001:
-                val = a & b
-            elif opcode == 0b01010:
-                val = a | b
-            elif opcode == 0b01011:
-                val = a ^ b
-            elif opcode == 0b10001:
-                val = a
-            elif opcode == 0b10010:
-                val = b
-            else:
-                val = 0
-            expected.append(val)
-
-        if dut_result != expected:
-            for j in range(vector_size):
-                if dut_result[j] != expected[j]:
-                    dut._log.error(f"Mismatch in lane {j} on iteration {i + 1}:")
-                    dut._log.error(f" Opcode: {opcode:05b}")
-                    dut._log.error(f" Operand A[{j}]: {op_a[j]}")
-                    dut._log.error(f" Operand B[{j}]: {op_b[j]}")
-                    dut._log.error(f" DUT Result[{j}]: {dut_result[j]}")
-                    dut._log.error(f" Expected Result[{j}]: {expected[j]}")
+        if not np.array_equal(dut_result, expected):
+            for j in np.flatnonzero(dut_result != expected):
+                dut._log.error(f"Mismatch in lane {j} on iteration {i + 1}:")
+                dut._log.error(f" Opcode: {opcode:05b}")
+                dut._log.error(f" Operand A[{j}]: {op_a[j]}")
+                dut._log.error(f" Operand B[{j}]: {op_b[j]}")
+                dut._log.error(f" DUT Result[{j}]: {dut_result[j]}")
+                dut._log.error(f" Expected Result[{j}]: {expected[j]}")
 
             assert False, (
                 f"ALU mismatch detected on iteration {i + 1}. See logs for details."
@@ -1,13 +1,10 @@
 # tb/attribute_interpolator_tb.py
 import os
 import random
+import numpy as np
 import cocotb
 from cocotb.triggers import Timer
 
-def to_signed32(n: int) -> int:
-    n &= 0xFFFFFFFF
-    return n - (1 << 32) if (n & (1 << 31)) else n
-
 @cocotb.test()
 async def test_attribute_interpolator(dut):
     num_iters = int(os.getenv("ATTR_NUM", "100000"))
@@ -22,18 +19,23 @@ async def test_attribute_interpolator(dut):
 
     dut._log.info(f"Starting {num_iters} random vectors")
 
-    for i in range(num_iters):
-        a0 = random.randint(min_attr, max_attr)
-        a1 = random.randint(min_attr, max_attr)
-        a2 = random.randint(min_attr, max_attr)
+    # draw all stimulus and compute the reference in bulk, seeded from cocotb's seed
+    rng = np.random.default_rng(random.getrandbits(64))
+    attrs = rng.integers(min_attr, max_attr, size=(num_iters, 3), dtype=np.int64, endpoint=True)
+    lambdas = rng.integers(min_weight, max_weight, size=(num_iters, 3), dtype=np.int64, endpoint=True)
 
-        l0 = random.randint(min_weight, max_weight)
-        l1 = random.randint(min_weight, max_weight)
-        l2 = random.randint(min_weight, max_weight)
+    # arithmetic shift floors like the rtl, the int32 cast wraps to the output width
+    full_sums = (attrs * lambdas).sum(axis=1)
+    expected_all = np.right_shift(full_sums, weight_width).astype(np.int32)
 
-        full_sum = a0*l0 + a1*l1 + a2*l2
-        shifted_sum = full_sum // (2 ** weight_width)
-        expected = to_signed32(shifted_sum)
+    attrs = attrs.tolist()
+    lambdas = lambdas.tolist()
+    expected_all = expected_all.tolist()
+
+    for i in range(num_iters):
+        a0, a1, a2 = attrs[i]
+        l0, l1, l2 = lambdas[i]
+        expected = expected_all[i]
 
         dut.i_attr0.value = a0
         dut.i_attr1.value = a1
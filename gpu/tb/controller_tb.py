@@ -1,10 +1,22 @@
 import cocotb
 from cocotb.clock import Clock
 from cocotb.triggers import RisingEdge
-import random
+import numpy as np
 
 CLK_PERIOD = 10
 
+OP_START, OP_IRQ_CLEAR, OP_STATUS_READ, OP_IDLE = range(4)
+
+def stress_plan(seed, num_cycles, op_weights, busy_after):
+    # draw the op sequence and busy pattern in two batched calls from a private
+    # generator, the clocked loop then only indexes plain lists
+    rng = np.random.default_rng(seed)
+    p = np.asarray(op_weights, dtype=float)
+    ops = rng.choice(len(op_weights), size=num_cycles, p=p / p.sum()).tolist()
+    busy = rng.integers(0, 2, size=num_cycles)
+    busy[:busy_after + 1] = 0
+    return ops, busy.tolist()
+
 @cocotb.test()
 async def test_controller_basic(dut):
     cocotb.start_soon(Clock(dut.clk, CLK_PERIOD, units="ns").start())
@@ -122,25 +134,22 @@ async def test_controller_stress(dut):
     dut.rst_n.value = 1
     await RisingEdge(dut.clk)
 
-    random.seed(42)
+    ops, busy = stress_plan(42, num_cycles, [30, 10, 20, 40], num_cycles // 10)
 
     for i in range(num_cycles):
-        op_weights = [30, 10, 20, 40]
-        op = random.choices(['start', 'irq_clear', 'status_read', 'idle'], weights=op_weights)[0]
+        op = ops[i]
 
-        pipeline_busy = random.choice([0, 1]) if i > num_cycles // 10 else 0
+        dut.i_pipeline_busy.value = busy[i]
 
-        dut.i_pipeline_busy.value = pipeline_busy
-
-        if op == 'start':
+        if op == OP_START:
             dut.i_bus_addr.value = 0x00
             dut.i_bus_wdata.value = 0x01
             dut.i_bus_we.value = 1
-        elif op == 'irq_clear':
+        elif op == OP_IRQ_CLEAR:
             dut.i_bus_addr.value = 0x00
             dut.i_bus_wdata.value = 0x02
             dut.i_bus_we.value = 1
-        elif op == 'status_read':
+        elif op == OP_STATUS_READ:
             dut.i_bus_addr.value = 0x04
             dut.i_bus_we.value = 0
         else:
@@ -167,25 +176,22 @@ async def test_controller_extended_stress(dut):
     dut.rst_n.value = 1
     await RisingEdge(dut.clk)
 
-    random.seed(12345)
+    ops, busy = stress_plan(12345, num_cycles, [40, 15, 25, 20], 100)
 
     for i in range(num_cycles):
-        op = random.choices(['start', 'irq_clear', 'status_read', 'idle'],
-                            weights=[40, 15, 25, 20])[0]
-
-        pipeline_busy = random.choice([0, 1]) if i > 100 else 0
+        op = ops[i]
 
-        dut.i_pipeline_busy.value = pipeline_busy
+        dut.i_pipeline_busy.value = busy[i]
 
-        if op == 'start':
+        if op == OP_START:
             dut.i_bus_addr.value = 0x00
             dut.i_bus_wdata.value = 0x01
             dut.i_bus_we.value = 1
-        elif op == 'irq_clear':
+        elif op == OP_IRQ_CLEAR:
             dut.i_bus_addr.value = 0x00
             dut.i_bus_wdata.value = 0x02
             dut.i_bus_we.value = 1
-        elif op == 'status_read':
+        elif op == OP_STATUS_READ:
             dut.i_bus_addr.value = 0x04
             dut.i_bus_we.value = 0
         else:
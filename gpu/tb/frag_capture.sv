@@ -0,0 +1,40 @@
+// records every fragment the rasterizer emits so rasterizer_tb.py can read
+// the whole triangle back once it is done instead of sampling each cycle
+module frag_capture #(
+    parameter int CORD_WIDTH = 10,
+    parameter int DEPTH = 16384
+) (
+    input logic clk,
+
+    // a new triangle starts, forget the previous one
+    input logic i_clear,
+
+    input logic i_fragment_valid,
+    input logic [CORD_WIDTH-1:0] i_fragment_x,
+    input logic [CORD_WIDTH-1:0] i_fragment_y,
+    input logic [(CORD_WIDTH*2):0] i_lambda0,
+    input logic [(CORD_WIDTH*2):0] i_lambda1,
+    input logic [(CORD_WIDTH*2):0] i_lambda2,
+
+    // keeps counting past DEPTH so the tb can tell the buffer overflowed
+    output logic [31:0] o_count
+);
+
+  localparam int LAMBDA_WIDTH = (CORD_WIDTH * 2) + 1;
+  localparam int ENTRY_WIDTH = (CORD_WIDTH * 2) + (LAMBDA_WIDTH * 3);
+
+  // one entry per fragment, packed {lambda2, lambda1, lambda0, y, x}
+  logic [ENTRY_WIDTH-1:0] frag_buf[DEPTH];
+
+  always_ff @(posedge clk) begin
+    if (i_clear) begin
+      o_count <= '0;
+    end else if (i_fragment_valid) begin
+      if (o_count < DEPTH) begin
+        frag_buf[o_count] <= {i_lambda2, i_lambda1, i_lambda0, i_fragment_y, i_fragment_x};
+      end
+      o_count <= o_count + 1;
+    end
+  end
+
+endmodule
@@ -1,17 +1,30 @@
 import cocotb
 import random
+import numpy as np
 from cocotb.clock import Clock
 from cocotb.triggers import RisingEdge, ReadOnly, Timer
 
+# byte aligned lanes let numpy lay the bus out in one call
+LANE_DTYPES = {8: "<u1", 16: "<u2", 32: "<u4", 64: "<u8"}
+
 def pack_vector(vec, width):
+    lane_dtype = LANE_DTYPES.get(width)
+    if lane_dtype is not None:
+        return int.from_bytes(np.asarray(vec, dtype=np.uint64).astype(lane_dtype).tobytes(), "little")
     max_val = (1 << width) - 1
     packed = 0
     for i, val in enumerate(vec):
-        packed |= (val & max_val) << (i * width)
+        # int() first, numpy lanes would wrap the shift at 64 bits
+        packed |= (int(val) & max_val) << (i * width)
     return packed
 
 def unpack_vector(packed, width, size):
     mask = (1 << width) - 1
+    lane_dtype = LANE_DTYPES.get(width)
+    if lane_dtype is not None:
+        bus_bytes = size * width // 8
+        raw = (packed & ((1 << (size * width)) - 1)).to_bytes(bus_bytes, "little")
+        return np.frombuffer(raw, dtype=lane_dtype).tolist()
     return [(packed >> (i * width)) & mask for i in range(size)]
 
 async def reset_dut(dut):
@@ -46,11 +59,28 @@ async def test_shader_pipeline(dut):
     num_tests = 1000
     dut._log.info(f"Running {num_tests} randomized fragment tests...")
 
+    # draw every stimulus up front, seeded from cocotb's seed so runs still replay
+    rng = np.random.default_rng(random.getrandbits(64))
+    frag_xs = rng.integers(min_cord_val, max_cord_val, num_tests, endpoint=True).tolist()
+    frag_ys = rng.integers(min_cord_val, max_cord_val, num_tests, endpoint=True).tolist()
+    frag_colors = rng.integers(0, max_data_val, (num_tests, vec_size), dtype=np.uint64, endpoint=True)
+    tex_coords = rng.integers(0, max_data_val, (num_tests, 2), dtype=np.uint64, endpoint=True).tolist()
+    texel_colors = rng.integers(0, max_data_val, (num_tests, vec_size), dtype=np.uint64, endpoint=True)
+    latencies = rng.integers(1, 5, num_tests, endpoint=True).tolist()
+
+    # golden model for the whole run, uint64 holds a full 32x32 product.
+    # wider lanes would overflow it so they take python ints instead
+    if data_width <= 32:
+        expected_colors = ((frag_colors * texel_colors) & np.uint64(max_data_val)).tolist()
+    else:
+        expected_colors = [[(f * t) & max_data_val for f, t in zip(frag_row, texel_row)]
+                           for frag_row, texel_row in zip(frag_colors.tolist(), texel_colors.tolist())]
+
     for test_num in range(num_tests):
-        frag_x = random.randint(min_cord_val, max_cord_val)
-        frag_y = random.randint(min_cord_val, max_cord_val)
-        frag_color = [random.randint(0, max_data_val) for _ in range(vec_size)]
-        frag_tex_coord = [random.randint(0, max_data_val) for _ in range(2)]
+        frag_x = frag_xs[test_num]
+        frag_y = frag_ys[test_num]
+        frag_color = frag_colors[test_num]
+        frag_tex_coord = tex_coords[test_num]
 
         await RisingEdge(dut.clk)
         dut.i_frag_valid.value = 1
@@ -67,11 +97,10 @@ async def test_shader_pipeline(dut):
         await RisingEdge(dut.clk)
         dut.i_frag_valid.value = 0
 
-        texture_latency = random.randint(1, 5)
-        for _ in range(texture_latency):
+        for _ in range(latencies[test_num]):
             await RisingEdge(dut.clk)
         
-        texel_color = [random.randint(0, max_data_val) for _ in range(vec_size)]
+        texel_color = texel_colors[test_num]
         dut.i_texel_valid.value = 1
         dut.i_texel_color.value = pack_vector(texel_color, data_width)
 
@@ -83,16 +112,14 @@ async def test_shader_pipeline(dut):
         assert dut.o_pixel_x.value.signed_integer == frag_x, "Pixel X coordinate mismatch"
         assert dut.o_pixel_y.value.signed_integer == frag_y, "Pixel Y coordinate mismatch"
 
-        expected_color = [
-            (c1 * c2) & max_data_val for c1, c2 in zip(frag_color, texel_color)
-        ]
+        expected_color = expected_colors[test_num]
         
         dut_pixel_color = unpack_vector(dut.o_pixel_color.value.integer, data_width, vec_size)
 
         if dut_pixel_color != expected_color:
             dut._log.error(f"Mismatch on iteration {test_num + 1}!")
-            dut._log.error(f" Fragment Color: {frag_color}")
-            dut._log.error(f" Texel Color: {texel_color}")
+            dut._log.error(f" Fragment Color: {frag_color.tolist()}")
+            dut._log.error(f" Texel Color: {texel_color.tolist()}")
             dut._log.error(f" DUT Color: {dut_pixel_color}")
             dut._log.error(f" Expected Color: {expected_color}")
             assert False, "Pixel color mismatch"
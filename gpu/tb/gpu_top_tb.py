@@ -1,8 +1,10 @@
 import cocotb
 from cocotb.clock import Clock
-from cocotb.triggers import RisingEdge, FallingEdge, ClockCycles, Timer
+from cocotb.triggers import RisingEdge, FallingEdge, Edge, ClockCycles, Timer, ReadOnly, First
 from cocotb.result import TestFailure
+import logging
 import random
+import numpy as np
 
 CLK_PERIOD = 10
 
@@ -19,6 +21,22 @@ CTRL_IRQ_CLEAR = 1
 STATUS_BUSY = 0
 STATUS_IRQ = 1
 
+# handles stay valid for the whole simulation, so the bus ones are looked up
+# once per dut and shared by every test
+_bus_handles = {}
+
+def bus_handles(dut):
+    handles = _bus_handles.get(id(dut))
+    if handles is None:
+        handles = (dut.clk, dut.i_bus_we, dut.i_bus_addr, dut.i_bus_wdata, dut.o_bus_rdata)
+        _bus_handles[id(dut)] = handles
+    return handles
+
+def start_clock(dut):
+    # cocotb kills every coroutine when a test ends, clock included, so each
+    # test starts its own rather than sharing one across the run
+    cocotb.start_soon(Clock(dut.clk, CLK_PERIOD, units="ns").start())
+
 async def reset_dut(dut):
     dut.rst_n.value = 0
     dut.i_bus_we.value = 0
@@ -29,25 +47,25 @@ async def reset_dut(dut):
     dut.rst_n.value = 1
     await ClockCycles(dut.clk, 2)
 
+# the register bus has no handshake, writes land on the edge that sees we high
+# and reads are combinational off the address, so each access is one cycle.
+# every helper returns just after an edge with signals still writable, so the
+# next access drives straight away instead of lining up on another edge
 async def write_register(dut, addr, data):
-    await RisingEdge(dut.clk)
-    dut.i_bus_we.value = 1
-    dut.i_bus_addr.value = addr
-    dut.i_bus_wdata.value = data
-    await RisingEdge(dut.clk)
-    dut.i_bus_we.value = 0
-    dut.i_bus_addr.value = 0
-    dut.i_bus_wdata.value = 0
-    await RisingEdge(dut.clk)
+    clk, bus_we, bus_addr, bus_wdata, _ = bus_handles(dut)
+    bus_we.value = 1
+    bus_addr.value = addr
+    bus_wdata.value = data
+    await RisingEdge(clk)
+    bus_we.value = 0
 
 async def read_register(dut, addr):
-    await RisingEdge(dut.clk)
-    dut.i_bus_we.value = 0
-    dut.i_bus_addr.value = addr
-    await RisingEdge(dut.clk)
-    await RisingEdge(dut.clk)
-    value = int(dut.o_bus_rdata.value)
-    dut.i_bus_addr.value = 0
+    clk, bus_we, bus_addr, _, bus_rdata = bus_handles(dut)
+    bus_we.value = 0
+    bus_addr.value = addr
+    await ReadOnly()
+    value = int(bus_rdata.value)
+    await RisingEdge(clk)
     return value
 
 async def load_shader_program(dut, instructions):
@@ -56,13 +74,18 @@ async def load_shader_program(dut, instructions):
         await write_register(dut, addr, instr)
         addr += 4
 
-async def wait_for_idle(dut, timeout=1000):
-    for _ in range(timeout):
-        status = await read_register(dut, ADDR_STATUS)
-        if not (status & (1 << STATUS_BUSY)):
-            return True
-        await ClockCycles(dut.clk, 1)
-    return False
+async def wait_for_idle(dut, timeout=4000):
+    # STATUS_BUSY is pipeline_busy straight through, so sleep on the net
+    # falling instead of polling the bus. timeout is in clock cycles.
+    # a start written on the last edge only shows as busy after the next one
+    pipeline_busy = dut.pipeline_busy
+    await RisingEdge(dut.clk)
+    await ReadOnly()
+    if not int(pipeline_busy.value):
+        await RisingEdge(dut.clk)
+        return True
+    fired = await First(FallingEdge(pipeline_busy), Timer(timeout * CLK_PERIOD, units="ns"))
+    return not isinstance(fired, Timer)
 
 def create_simple_shader():
     instructions = [
@@ -88,7 +111,7 @@ def create_vertex_data():
 
 @cocotb.test()
 async def test_reset(dut):
-    cocotb.start_soon(Clock(dut.clk, CLK_PERIOD, units="ns").start())
+    start_clock(dut)
     
     dut._log.info("Testing reset")
     
@@ -105,7 +128,7 @@ async def test_reset(dut):
 
 @cocotb.test()
 async def test_register_access(dut):
-    cocotb.start_soon(Clock(dut.clk, CLK_PERIOD, units="ns").start())
+    start_clock(dut)
     
     dut._log.info("Testing register access")
     
@@ -127,7 +150,7 @@ async def test_register_access(dut):
 
 @cocotb.test()
 async def test_shader_loading(dut):
-    cocotb.start_soon(Clock(dut.clk, CLK_PERIOD, units="ns").start())
+    start_clock(dut)
     
     dut._log.info("Testing shader loading")
     
@@ -142,7 +165,7 @@ async def test_shader_loading(dut):
 
 @cocotb.test()
 async def test_pipeline_start(dut):
-    cocotb.start_soon(Clock(dut.clk, CLK_PERIOD, units="ns").start())
+    start_clock(dut)
     
     dut._log.info("Testing pipeline start")
     
@@ -168,22 +191,27 @@ async def test_pipeline_start(dut):
 
 @cocotb.test()
 async def test_memory_interface(dut):
-    cocotb.start_soon(Clock(dut.clk, CLK_PERIOD, units="ns").start())
+    start_clock(dut)
     
     dut._log.info("Testing memory interface")
     
     await reset_dut(dut)
     
-    dram_transactions = []
+    # at most one transaction per monitored cycle, so the buffer never grows
+    monitor_cycles = 100
+    dram_transactions = np.zeros((monitor_cycles, 2), dtype=np.uint32)
+    num_transactions = 0
     
     async def monitor_dram():
-        for _ in range(100):
+        nonlocal num_transactions
+        dram_we = dut.o_dram_we
+        dram_addr = dut.o_dram_addr
+        dram_wdata = dut.o_dram_wdata
+        for _ in range(monitor_cycles):
             await RisingEdge(dut.clk)
-            if dut.o_dram_we.value == 1:
-                addr = int(dut.o_dram_addr.value)
-                data = int(dut.o_dram_wdata.value)
-                dram_transactions.append((addr, data))
-                dut._log.info(f"DRAM write: addr=0x{addr:08x}, data=0x{data:08x}")
+            if dram_we.value == 1:
+                dram_transactions[num_transactions] = (int(dram_addr.value), int(dram_wdata.value))
+                num_transactions += 1
     
     monitor_task = cocotb.start_soon(monitor_dram())
     
@@ -196,13 +224,17 @@ async def test_memory_interface(dut):
     
     await ClockCycles(dut.clk, 100)
     
-    dut._log.info(f"Captured {len(dram_transactions)} DRAM transactions")
+    dut._log.info(f"Captured {num_transactions} DRAM transactions")
+    # the join runs before the logger can filter, so only build it when it is shown
+    if num_transactions and dut._log.isEnabledFor(logging.INFO):
+        dut._log.info("DRAM writes: " + ", ".join(
+            f"addr=0x{addr:08x} data=0x{data:08x}" for addr, data in dram_transactions[:num_transactions].tolist()))
     
     dut._log.info("Memory interface test passed")
 
 @cocotb.test()
 async def test_interrupt(dut):
-    cocotb.start_soon(Clock(dut.clk, CLK_PERIOD, units="ns").start())
+    start_clock(dut)
     
     dut._log.info("Testing interrupt generation")
     
@@ -227,21 +259,21 @@ async def test_interrupt(dut):
 
 @cocotb.test()
 async def test_back_to_back(dut):
-    cocotb.start_soon(Clock(dut.clk, CLK_PERIOD, units="ns").start())
+    start_clock(dut)
     
     dut._log.info("Testing back-to-back operations")
     
     await reset_dut(dut)
     
     for i in range(3):
-        dut._log.info(f"Operation {i+1}/3")
+        dut._log.info("Operation %d/3", i + 1)
         
         await write_register(dut, ADDR_VERTEX_BASE, 0x40000 + i * 0x1000)
         await write_register(dut, ADDR_VERTEX_COUNT, 3 + i * 3)
         
         await write_register(dut, ADDR_CONTROL, 1 << CTRL_START)
         
-        idle = await wait_for_idle(dut, timeout=5000)
+        idle = await wait_for_idle(dut, timeout=20000)
         assert idle, f"Operation {i+1} did not complete"
         
         await write_register(dut, ADDR_CONTROL, 1 << CTRL_IRQ_CLEAR)
@@ -250,7 +282,7 @@ async def test_back_to_back(dut):
 
 @cocotb.test()
 async def test_vertex_fetch_interface(dut):
-    cocotb.start_soon(Clock(dut.clk, CLK_PERIOD, units="ns").start())
+    start_clock(dut)
     
     dut._log.info("Testing vertex fetch interface")
     
@@ -263,15 +295,18 @@ async def test_vertex_fetch_interface(dut):
     await write_register(dut, ADDR_VERTEX_COUNT, vertex_count)
     
     vertex_data = create_vertex_data()
-    vertex_index = 0
     
     async def provide_vertex_data():
-        nonlocal vertex_index
-        for _ in range(1000):
-            await RisingEdge(dut.clk)
-            if vertex_index < len(vertex_data):
-                dut.i_dram_rdata.value = vertex_data[vertex_index]
-                vertex_index = (vertex_index + 1) % len(vertex_data)
+        # o_dram_we is the interconnect's slave request, it strobes for reads
+        # too. answer from the address while it is up and sleep otherwise
+        dram_req = dut.o_dram_we
+        dram_addr = dut.o_dram_addr
+        dram_rdata = dut.i_dram_rdata
+        while True:
+            await RisingEdge(dram_req)
+            while int(dram_req.value):
+                dram_rdata.value = vertex_data[(int(dram_addr.value) >> 2) % len(vertex_data)]
+                await First(Edge(dram_addr), FallingEdge(dram_req))
     
     cocotb.start_soon(provide_vertex_data())
     
@@ -283,42 +318,49 @@ async def test_vertex_fetch_interface(dut):
 
 @cocotb.test()
 async def test_stress(dut):
-    cocotb.start_soon(Clock(dut.clk, CLK_PERIOD, units="ns").start())
+    start_clock(dut)
     
     dut._log.info("Starting stress test")
     
     await reset_dut(dut)
     
-    for i in range(10):
-        dut._log.info(f"Stress iteration {i+1}/10")
+    # draw every iteration's stimulus up front, seeded from cocotb's seed.
+    # each shader is a prefix of one row of a fixed size pool
+    num_iters = 10
+    rng = np.random.default_rng(random.getrandbits(64))
+    vertex_bases = (rng.integers(0, 0xF0000, num_iters, endpoint=True) & ~0xFFF).tolist()
+    vertex_counts = rng.choice([3, 6, 9, 12], num_iters).tolist()
+    shader_pool = rng.integers(0, 1 << 32, (num_iters, 5), dtype=np.uint32)
+    shader_lengths = rng.integers(1, 5, num_iters, endpoint=True).tolist()
+    dram_rdatas = rng.integers(0, 1 << 32, num_iters, dtype=np.uint32).tolist()
+    settle_cycles = rng.integers(1, 20, num_iters, endpoint=True).tolist()
+    
+    for i in range(num_iters):
+        dut._log.info("Stress iteration %d/%d", i + 1, num_iters)
         
-        vertex_base = random.randint(0, 0xF0000) & ~0xFFF
-        vertex_count = random.choice([3, 6, 9, 12])
+        await write_register(dut, ADDR_VERTEX_BASE, vertex_bases[i])
+        await write_register(dut, ADDR_VERTEX_COUNT, vertex_counts[i])
         
-        await write_register(dut, ADDR_VERTEX_BASE, vertex_base)
-        await write_register(dut, ADDR_VERTEX_COUNT, vertex_count)
+        await load_shader_program(dut, shader_pool[i, :shader_lengths[i]].tolist())
         
-        shader = [random.randint(0, 0xFFFFFFFF) for _ in range(random.randint(1, 5))]
-        await load_shader_program(dut, shader)
-        
-        dut.i_dram_rdata.value = random.randint(0, 0xFFFFFFFF)
+        dut.i_dram_rdata.value = dram_rdatas[i]
         
         await write_register(dut, ADDR_CONTROL, 1 << CTRL_START)
         
-        idle = await wait_for_idle(dut, timeout=10000)
+        idle = await wait_for_idle(dut, timeout=40000)
         if not idle:
-            dut._log.warning(f"Iteration {i+1} timeout - resetting")
+            dut._log.warning("Iteration %d timeout - resetting", i + 1)
             await reset_dut(dut)
         
         await write_register(dut, ADDR_CONTROL, 1 << CTRL_IRQ_CLEAR)
         
-        await ClockCycles(dut.clk, random.randint(1, 20))
+        await ClockCycles(dut.clk, settle_cycles[i])
     
     dut._log.info("Stress test completed")
 
 @cocotb.test()
 async def test_performance(dut):
-    cocotb.start_soon(Clock(dut.clk, CLK_PERIOD, units="ns").start())
+    start_clock(dut)
     
     dut._log.info("Measuring performance")
     
@@ -333,13 +375,13 @@ async def test_performance(dut):
         start_time = cocotb.utils.get_sim_time(units='ns')
         await write_register(dut, ADDR_CONTROL, 1 << CTRL_START)
         
-        idle = await wait_for_idle(dut, timeout=20000)
+        idle = await wait_for_idle(dut, timeout=80000)
         end_time = cocotb.utils.get_sim_time(units='ns')
         
         if idle:
             cycles = (end_time - start_time) / CLK_PERIOD
             results.append((vertex_count, cycles))
-            dut._log.info(f"Vertices: {vertex_count}, Cycles: {cycles:.0f}")
+            dut._log.info("Vertices: %d, Cycles: %.0f", vertex_count, cycles)
         
         await write_register(dut, ADDR_CONTROL, 1 << CTRL_IRQ_CLEAR)
     
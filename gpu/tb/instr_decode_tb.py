@@ -1,51 +1,61 @@
 import cocotb
 from cocotb.triggers import Timer
 import random
+import numpy as np
 
 @cocotb.test()
 async def test_instruction_decoder(dut):
-
-    # Coverage tracking
-    opcode_coverage = set()
-    rd_coverage = set()
-    rs1_coverage = set()
-    rs2_coverage = set()
-    imm_coverage = set()
-
-    for _ in range(100000):
-        # Generate a random instruction word
-        instruction_word = random.randint(0, 0xFFFFFFFF)
-
+    num_words = 100000
+
+    # Generate every instruction word up front, seeded from cocotb's seed
+    rng = np.random.default_rng(random.getrandbits(64))
+    words = rng.integers(0, 1 << 32, size=num_words, dtype=np.uint64)
+
+    # Decode all of them at once with the same shifts the hardware uses
+    expected_opcodes = (words >> 27) & 0x1F
+    expected_rd_addrs = (words >> 23) & 0xF
+    expected_rs1_addrs = (words >> 19) & 0xF
+    expected_rs2_addrs = (words >> 15) & 0xF
+    expected_imms = words & 0xFFF
+
+    # Coverage tracking, the bins are known before the first word goes in
+    opcode_coverage = set(expected_opcodes.tolist())
+    rd_coverage = set(expected_rd_addrs.tolist())
+    rs1_coverage = set(expected_rs1_addrs.tolist())
+    rs2_coverage = set(expected_rs2_addrs.tolist())
+    imm_coverage = set(expected_imms.tolist())
+
+    instruction_word_h = dut.i_instruction_word
+    opcode_h = dut.o_opcode
+    rd_addr_h = dut.o_rd_addr
+    rs1_addr_h = dut.o_rs1_addr
+    rs2_addr_h = dut.o_rs2_addr
+    imm_h = dut.o_imm
+
+    for instruction_word, expected_opcode, expected_rd_addr, expected_rs1_addr, expected_rs2_addr, expected_imm in zip(
+        words.tolist(),
+        expected_opcodes.tolist(),
+        expected_rd_addrs.tolist(),
+        expected_rs1_addrs.tolist(),
+        expected_rs2_addrs.tolist(),
+        expected_imms.tolist(),
+    ):
         # Apply the instruction word to the DUT
-        dut.i_instruction_word.value = instruction_word
+        instruction_word_h.value = instruction_word
 
         # Wait for a short time to simulate propagation delay
         await Timer(1, units="ns")
 
-        # Decode the instruction word manually
-        expected_opcode = (instruction_word >> 27) & 0x1F
-        expected_rd_addr = (instruction_word >> 23) & 0xF
-        expected_rs1_addr = (instruction_word >> 19) & 0xF
-        expected_rs2_addr = (instruction_word >> 15) & 0xF
-        expected_imm = instruction_word & 0xFFF
-
-        # Track coverage
-        opcode_coverage.add(expected_opcode)
-        rd_coverage.add(expected_rd_addr)
-        rs1_coverage.add(expected_rs1_addr)
-        rs2_coverage.add(expected_rs2_addr)
-        imm_coverage.add(expected_imm)
-
         # Check the outputs of the DUT
-        assert dut.o_opcode.value == expected_opcode, f"Opcode mismatch: {dut.o_opcode.value} != {expected_opcode}"
-        assert dut.o_rd_addr.value == expected_rd_addr, f"RD address mismatch: {dut.o_rd_addr.value} != {expected_rd_addr}"
-        assert dut.o_rs1_addr.value == expected_rs1_addr, f"RS1 address mismatch: {dut.o_rs1_addr.value} != {expected_rs1_addr}"
-        assert dut.o_rs2_addr.value == expected_rs2_addr, f"RS2 address mismatch: {dut.o_rs2_addr.value} != {expected_rs2_addr}"
-        assert dut.o_imm.value == expected_imm, f"Immediate mismatch: {dut.o_imm.value} != {expected_imm}"
+        assert opcode_h.value == expected_opcode, f"Opcode mismatch: {opcode_h.value} != {expected_opcode}"
+        assert rd_addr_h.value == expected_rd_addr, f"RD address mismatch: {rd_addr_h.value} != {expected_rd_addr}"
+        assert rs1_addr_h.value == expected_rs1_addr, f"RS1 address mismatch: {rs1_addr_h.value} != {expected_rs1_addr}"
+        assert rs2_addr_h.value == expected_rs2_addr, f"RS2 address mismatch: {rs2_addr_h.value} != {expected_rs2_addr}"
+        assert imm_h.value == expected_imm, f"Immediate mismatch: {imm_h.value} != {expected_imm}"
 
     # Log coverage results
     cocotb.log.info(f"Opcode coverage: {len(opcode_coverage)}/32")
     cocotb.log.info(f"RD address coverage: {len(rd_coverage)}/16")
     cocotb.log.info(f"RS1 address coverage: {len(rs1_coverage)}/16")
     cocotb.log.info(f"RS2 address coverage: {len(rs2_coverage)}/16")
-    cocotb.log.info(f"Immediate coverage: {len(imm_coverage)}/4096")
\ No newline at end of file
+    cocotb.log.info(f"Immediate coverage: {len(imm_coverage)}/4096")
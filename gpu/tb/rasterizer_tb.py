@@ -1,9 +1,13 @@
 import cocotb
+import logging
+import os
 import random
-from cocotb.triggers import Timer, RisingEdge, FallingEdge
-from cocotb.clock import Clock
+import numpy as np
+from cocotb.triggers import RisingEdge, FallingEdge, ClockCycles, First
 from cocotb.binary import BinaryValue
 
+CLK_PERIOD = 10
+
 
 def calculate_barycentric(x, y, v0_x, v0_y, v1_x, v1_y, v2_x, v2_y):
     """Calculate barycentric coordinates for a point (x,y) relative to triangle (v0,v1,v2)"""
@@ -15,12 +19,6 @@ def calculate_barycentric(x, y, v0_x, v0_y, v1_x, v1_y, v2_x, v2_y):
     return edge0, edge1, edge2
 
 
-def is_point_inside_triangle(edge0, edge1, edge2):
-    """Check if point is inside triangle using edge functions"""
-    # For counter-clockwise triangle, point is inside if all edge functions >= 0
-    return (edge0 >= 0) and (edge1 >= 0) and (edge2 >= 0)
-
-
 def get_triangle_bounding_box(v0_x, v0_y, v1_x, v1_y, v2_x, v2_y):
     """Calculate bounding box of triangle"""
     min_x = min(v0_x, v1_x, v2_x)
@@ -30,193 +28,206 @@ def get_triangle_bounding_box(v0_x, v0_y, v1_x, v1_y, v2_x, v2_y):
     return min_x, min_y, max_x, max_y
 
 
-@cocotb.test()
-async def test_rasterizer_simple_triangle(dut):
-    """Test with a simple, large triangle that should definitely generate fragments"""
-    dut._log.info("---- SIMPLE TRIANGLE TEST ----")
-
-    # Start a clock
-    clock = Clock(dut.clk, 10, units="ns")
-    cocotb.start_soon(clock.start())
-
-    # Reset the DUT
-    dut.rst_n.value = 0
-    dut.i_start.value = 0
-    dut.i_v0_x.value = 0
-    dut.i_v0_y.value = 0
-    dut.i_v1_x.value = 0
-    dut.i_v1_y.value = 0
-    dut.i_v2_x.value = 0
-    dut.i_v2_y.value = 0
-
-    await Timer(20, units="ns")
-    dut.rst_n.value = 1
-    await Timer(20, units="ns")
-
-    # Large, obvious triangle: (0,0), (0,20), (15,10) - counter-clockwise
-    v0_x, v0_y = 0, 0
-    v1_x, v1_y = 0, 20
-    v2_x, v2_y = 15, 10
-
-    dut._log.info(f"Testing large triangle: ({v0_x},{v0_y}), ({v1_x},{v1_y}), ({v2_x},{v2_y})")
-
-    dut.i_v0_x.value = v0_x
-    dut.i_v0_y.value = v0_y
-    dut.i_v1_x.value = v1_x
-    dut.i_v1_y.value = v1_y
-    dut.i_v2_x.value = v2_x
-    dut.i_v2_y.value = v2_y
-    dut.i_start.value = 1
+def edge_function_grid(v0_x, v0_y, v1_x, v1_y, v2_x, v2_y):
+    """Edge functions for every pixel of the triangle's bounding box in one numpy pass
 
-    await RisingEdge(dut.clk)
-    dut.i_start.value = 0
+    Returns the (H, W, 3) edge values indexed [y - min_y, x - min_x], the
+    matching inside mask and the box origin (min_x, min_y)
+    """
+    min_x, min_y, max_x, max_y = get_triangle_bounding_box(v0_x, v0_y, v1_x, v1_y, v2_x, v2_y)
+    ys, xs = np.mgrid[min_y:max_y + 1, min_x:max_x + 1]
+    # calculate_barycentric is plain arithmetic, so it works on whole arrays too
+    edges = np.stack(calculate_barycentric(xs, ys, v0_x, v0_y, v1_x, v1_y, v2_x, v2_y), axis=-1)
+    return edges, np.all(edges >= 0, axis=-1), min_x, min_y
+
+
+def pack_vertices(vertices, cord_width):
+    """Pack (v0_x, v0_y, v1_x, v1_y, v2_x, v2_y) into the rasterizer_th i_vertices bus"""
+    # one write per triangle instead of six, v0_x sits in the low bits
+    mask = (1 << cord_width) - 1
+    packed = 0
+    for i, coord in enumerate(vertices):
+        packed |= (coord & mask) << (i * cord_width)
+    return packed
+
+# random triangle coverage: winding x bounding box size, plus degenerate ones
+RANDOM_TRIANGLE_BINS = [
+    (winding, size) for winding in ("front", "back") for size in ("small", "medium", "large")
+] + [("degenerate", None)]
+MIN_BIN_HITS = 10
+
+
+def triangle_coverage_bin(v0_x, v0_y, v1_x, v1_y, v2_x, v2_y):
+    """Coverage bin of a triangle, front facing triangles are the ones that produce fragments"""
+    cross = (v1_x - v0_x) * (v2_y - v0_y) - (v1_y - v0_y) * (v2_x - v0_x)
+    if cross == 0:
+        return ("degenerate", None)
 
-    # Collect all output fragments
+    min_x, min_y, max_x, max_y = get_triangle_bounding_box(v0_x, v0_y, v1_x, v1_y, v2_x, v2_y)
+    span = max(max_x - min_x, max_y - min_y)
+    if span <= 8:
+        size = "small"
+    elif span <= 50:
+        size = "medium"
+    else:
+        size = "large"
+    return ("front" if cross < 0 else "back", size)
+
+
+class RasterizerPorts:
+    def __init__(self, dut):
+        # bind the handles once, every dut.<name> is a lookup through the hierarchy
+        self.clk = dut.clk
+        self.i_start = dut.i_start
+        self.i_vertices = dut.i_vertices
+        self.i_timeout_cycles = dut.i_timeout_cycles
+        self.o_done = dut.o_done
+        self.done_edge = RisingEdge(dut.o_done)
+        self.timeout_edge = RisingEdge(dut.o_timeout)
+        self.o_frag_count = dut.o_frag_count
+        self.frag_buf = dut.u_capture.frag_buf
+        self.cord_width = int(dut.CORD_WIDTH.value)
+        self.max_fragments = int(dut.MAX_FRAGMENTS.value)
+
+
+async def start_triangle(ports, vertices, timeout_cycles):
+    """Load (v0_x, v0_y, v1_x, v1_y, v2_x, v2_y) and pulse i_start for one edge
+
+    o_timeout rises timeout_cycles edges later if the triangle is not done
+    """
+    ports.i_vertices.value = pack_vertices(vertices, ports.cord_width)
+    ports.i_timeout_cycles.value = timeout_cycles
+    ports.i_start.value = 1
+    await RisingEdge(ports.clk)
+    ports.i_start.value = 0
+
+
+async def collect_until_done(ports):
+    """Wait for the triangle started on the last edge to finish and read back its fragments"""
+    # rasterizer_th captures every fragment in hardware, so python sleeps until
+    # done instead of sampling the outputs on every edge. the harness watchdog
+    # armed by start_triangle makes a stalled rasterizer fail fast
+    fired = await First(ports.done_edge, ports.timeout_edge)
+    assert fired is ports.done_edge, "Rasterizer did not finish before the watchdog timed out"
+    # the last fragment is written on the edge done rises, step past it
+    await RisingEdge(ports.clk)
+
+    cord_width = ports.cord_width
+    cord_mask = (1 << cord_width) - 1
+    lambda_width = cord_width * 2 + 1
+    lambda_mask = (1 << lambda_width) - 1
+    lambda_shift = cord_width * 2
+
+    count = ports.o_frag_count.value.integer
+    assert count <= ports.max_fragments, f"Fragment capture overflowed: {count} fragments"
+
+    frag_buf = ports.frag_buf
     fragments = []
-    max_cycles = 1000000  # Safety timeout
-
-    for cycle in range(max_cycles):
-        await RisingEdge(dut.clk)
-
-        if int(dut.o_fragment_valid.value) == 1:
-            frag_x = int(dut.o_fragment_x.value)
-            frag_y = int(dut.o_fragment_y.value)
-            lambda0 = int(dut.o_lambda0.value)
-            lambda1 = int(dut.o_lambda1.value)
-            lambda2 = int(dut.o_lambda2.value)
-
-            fragments.append((frag_x, frag_y, lambda0, lambda1, lambda2))
-            dut._log.info(f"Fragment: ({frag_x},{frag_y}) lambdas: {lambda0}, {lambda1}, {lambda2}")
-
-        if int(dut.o_done.value) == 1:
-            dut._log.info("Done signal received")
-            break
-
-    dut._log.info(f"Collected {len(fragments)} fragments")
-
-    # The triangle should generate some fragments, but if it doesn't, that's still OK
-    # The important thing is that the rasterizer completes correctly
-    if len(fragments) == 0:
-        dut._log.info("No fragments generated - this might be due to triangle shape or pixel coverage")
-        return
-
-    # A triangle this size should definitely generate fragments
-    assert len(fragments) > 0, f"Large triangle should generate fragments, got {len(fragments)}"
-
-    # Verify all fragments are inside the triangle
-    for frag_x, frag_y, lambda0, lambda1, lambda2 in fragments:
-        # Check that all lambdas are non-negative (inside triangle)
-        assert lambda0 >= 0, f"Lambda0 should be >= 0 for inside point, got {lambda0}"
-        assert lambda1 >= 0, f"Lambda1 should be >= 0 for inside point, got {lambda1}"
-        assert lambda2 >= 0, f"Lambda2 should be >= 0 for inside point, got {lambda2}"
-
-        # Check point is inside triangle using software calculation
-        expected_e0, expected_e1, expected_e2 = calculate_barycentric(
-            frag_x, frag_y, v0_x, v0_y, v1_x, v1_y, v2_x, v2_y
-        )
-
-        assert is_point_inside_triangle(expected_e0, expected_e1, expected_e2), \
-            f"Point ({frag_x},{frag_y}) should be inside triangle"
+    for i in range(count):
+        entry = frag_buf[i].value.integer
+        fragments.append((
+            entry & cord_mask,
+            (entry >> cord_width) & cord_mask,
+            (entry >> lambda_shift) & lambda_mask,
+            (entry >> (lambda_shift + lambda_width)) & lambda_mask,
+            (entry >> (lambda_shift + 2 * lambda_width)) & lambda_mask,
+        ))
+    return fragments
+
+
+# directed triangles run back to back in one test: (name, vertices, watchdog
+# cycles). every case gets the same checks, fragments inside the triangle
+# and its bounding box with matching edge signs, and done held afterwards
+DIRECTED_TRIANGLES = [
+    # Large, obvious triangle - counter-clockwise
+    ("simple", (0, 0, 0, 20, 15, 10), 10000),
+    # should be counter-clockwise
+    ("basic", (0, 0, 10, 0, 5, 8), 2000),
+    # Triangle with known bounding box
+    ("bounding box", (10, 10, 20, 15, 15, 25), 1000),
+    ("done signal", (0, 0, 5, 0, 2, 4), 500),
+]
 
-    dut._log.info("Simple triangle test passed!")
-    """Test basic triangle rasterization"""
-    dut._log.info("---- RASTERIZER BASIC TRIANGLE TEST ----")
 
-    # Start a clock
-    clock = Clock(dut.clk, 10000, units="ns")
-    cocotb.start_soon(clock.start())
+@cocotb.test()
+async def test_rasterizer_directed_triangles(dut):
+    """Test fragments, bounding box and done signal on a few directed triangles"""
+    dut._log.info("---- RASTERIZER DIRECTED TRIANGLES TEST ----")
+    ports = RasterizerPorts(dut)
 
-    # Reset the DUT
+    # Reset once, the rasterizer is back in idle after every triangle
     dut.rst_n.value = 0
     dut.i_start.value = 0
-    dut.i_v0_x.value = 0
-    dut.i_v0_y.value = 0
-    dut.i_v1_x.value = 0
-    dut.i_v1_y.value = 0
-    dut.i_v2_x.value = 0
-    dut.i_v2_y.value = 0
-
-    await Timer(20, units="ns")
-    dut.rst_n.value = 1
-    await Timer(20, units="ns")
-
-    # Test triangle: (0,0), (10,0), (5,8) - should be counter-clockwise
-    v0_x, v0_y = 0, 0
-    v1_x, v1_y = 10, 0
-    v2_x, v2_y = 5, 8
-
-    dut._log.info(f"Testing triangle: ({v0_x},{v0_y}), ({v1_x},{v1_y}), ({v2_x},{v2_y})")
-
-    dut.i_v0_x.value = v0_x
-    dut.i_v0_y.value = v0_y
-    dut.i_v1_x.value = v1_x
-    dut.i_v1_y.value = v1_y
-    dut.i_v2_x.value = v2_x
-    dut.i_v2_y.value = v2_y
-    dut.i_start.value = 1
-
-    await RisingEdge(dut.clk)
-    dut.i_start.value = 0
-
-    # Collect all output fragments
-    fragments = []
-    max_cycles = 2000  # Safety timeout
-
-    for cycle in range(max_cycles):
-        await RisingEdge(dut.clk)
-
-        if int(dut.o_fragment_valid.value) == 1:
-            frag_x = int(dut.o_fragment_x.value)
-            frag_y = int(dut.o_fragment_y.value)
-            lambda0 = int(dut.o_lambda0.value)
-            lambda1 = int(dut.o_lambda1.value)
-            lambda2 = int(dut.o_lambda2.value)
+    dut.i_vertices.value = 0
 
-            fragments.append((frag_x, frag_y, lambda0, lambda1, lambda2))
-            dut._log.info(f"Fragment: ({frag_x},{frag_y}) lambdas: {lambda0}, {lambda1}, {lambda2}")
-
-        if int(dut.o_done.value) == 1:
-            dut._log.info("Done signal received")
-            break
+    await ClockCycles(dut.clk, 2)
+    dut.rst_n.value = 1
+    await ClockCycles(dut.clk, 2)
+
+    for name, vertices, timeout_cycles in DIRECTED_TRIANGLES:
+        v0_x, v0_y, v1_x, v1_y, v2_x, v2_y = vertices
+        dut._log.info(f"Testing {name} triangle: ({v0_x},{v0_y}), ({v1_x},{v1_y}), ({v2_x},{v2_y})")
+
+        await start_triangle(ports, vertices, timeout_cycles)
+
+        # Collect all output fragments, fails if done never rises
+        fragments = await collect_until_done(ports)
+        # per fragment logs only when debugging, a record per fragment adds up
+        if dut._log.isEnabledFor(logging.DEBUG):
+            for frag_x, frag_y, lambda0, lambda1, lambda2 in fragments:
+                dut._log.debug("Fragment: (%d,%d) lambdas: %d, %d, %d", frag_x, frag_y, lambda0, lambda1, lambda2)
+
+        dut._log.info(f"{name}: collected {len(fragments)} fragments")
+
+        # After done is asserted it should remain high and no more valid
+        # fragments should be output, check for a few cycles after done
+        done_fall = FallingEdge(dut.o_done)
+        fragment_rise = RisingEdge(dut.o_fragment_valid)
+        fired = await First(done_fall, fragment_rise, ClockCycles(dut.clk, 5))
+        assert fired is not done_fall, f"{name}: Done signal should remain high after completion"
+        assert fired is not fragment_rise, f"{name}: No valid fragments should be output after done"
+
+        # If no fragments, it might be due to coordinate range or triangle orientation
+        if len(fragments) == 0:
+            dut._log.info(f"{name}: no fragments generated - this might be due to triangle shape or pixel coverage")
+        else:
+            # Edge values for the whole bounding box, each fragment is a lookup
+            edges, inside, box_x, box_y = edge_function_grid(v0_x, v0_y, v1_x, v1_y, v2_x, v2_y)
+            min_x, min_y, max_x, max_y = get_triangle_bounding_box(v0_x, v0_y, v1_x, v1_y, v2_x, v2_y)
 
-    dut._log.info(f"Collected {len(fragments)} fragments")
+            for frag_x, frag_y, lambda0, lambda1, lambda2 in fragments:
+                # Verify all fragments are within bounding box
+                assert min_x <= frag_x <= max_x, f"Fragment x={frag_x} outside bounding box [{min_x}, {max_x}]"
+                assert min_y <= frag_y <= max_y, f"Fragment y={frag_y} outside bounding box [{min_y}, {max_y}]"
 
-    # For a small triangle like this, we expect some fragments
-    # If no fragments, it might be due to coordinate range or triangle orientation
-    if len(fragments) == 0:
-        dut._log.info("No fragments generated - this might be expected for small triangles")
-        return
+                # Check that hardware edge functions match expected
+                row, col = frag_y - box_y, frag_x - box_x
+                expected_e0, expected_e1, expected_e2 = edges[row, col].tolist()
 
-    # Verify all fragments are inside the triangle
-    for frag_x, frag_y, lambda0, lambda1, lambda2 in fragments:
-        # Check that hardware edge functions match expected
-        expected_e0, expected_e1, expected_e2 = calculate_barycentric(
-            frag_x, frag_y, v0_x, v0_y, v1_x, v1_y, v2_x, v2_y
-        )
+                dut._log.debug("Fragment (%d,%d): HW lambdas (%d,%d,%d), Expected (%d,%d,%d)",
+                               frag_x, frag_y, lambda0, lambda1, lambda2, expected_e0, expected_e1, expected_e2)
 
-        dut._log.info(f"Fragment ({frag_x},{frag_y}): HW lambdas ({lambda0},{lambda1},{lambda2}), Expected ({expected_e0},{expected_e1},{expected_e2})")
+                # The lambdas should be proportional, but might have different scaling
+                # Check that the signs are the same (all positive for inside triangle)
+                assert (lambda0 >= 0) == (expected_e0 >= 0), f"Lambda0 sign mismatch: HW={lambda0}, Expected={expected_e0}"
+                assert (lambda1 >= 0) == (expected_e1 >= 0), f"Lambda1 sign mismatch: HW={lambda1}, Expected={expected_e1}"
+                assert (lambda2 >= 0) == (expected_e2 >= 0), f"Lambda2 sign mismatch: HW={lambda2}, Expected={expected_e2}"
 
-        # The lambdas should be proportional, but might have different scaling
-        # Check that the signs are the same (all positive for inside triangle)
-        assert (lambda0 >= 0) == (expected_e0 >= 0), f"Lambda0 sign mismatch: HW={lambda0}, Expected={expected_e0}"
-        assert (lambda1 >= 0) == (expected_e1 >= 0), f"Lambda1 sign mismatch: HW={lambda1}, Expected={expected_e1}"
-        assert (lambda2 >= 0) == (expected_e2 >= 0), f"Lambda2 sign mismatch: HW={lambda2}, Expected={expected_e2}"
+                # Check point is inside triangle using software calculation
+                assert inside[row, col], \
+                    f"Point ({frag_x},{frag_y}) should be inside triangle"
 
-        # Check point is inside triangle
-        assert is_point_inside_triangle(expected_e0, expected_e1, expected_e2), \
-            f"Point ({frag_x},{frag_y}) should be inside triangle"
+        # idle between cases instead of another reset
+        await ClockCycles(dut.clk, 4)
 
-    dut._log.info("Basic triangle test passed!")
+    dut._log.info("Directed triangles test passed!")
 
 
 @cocotb.test()
 async def test_rasterizer_edge_cases(dut):
     """Test edge cases: degenerate triangles, single points, lines"""
     dut._log.info("---- RASTERIZER EDGE CASES TEST ----")
-
-    # Start a clock
-    clock = Clock(dut.clk, 10, units="ns")
-    cocotb.start_soon(clock.start())
+    ports = RasterizerPorts(dut)
 
     test_cases = [
         # Single point triangle (all vertices same)
@@ -234,35 +245,14 @@ async def test_rasterizer_edge_cases(dut):
 
         # Reset and setup
         dut.rst_n.value = 0
-        await Timer(20, units="ns")
+        await ClockCycles(dut.clk, 2)
         dut.rst_n.value = 1
-        await Timer(20, units="ns")
-
-        dut.i_v0_x.value = v0_x
-        dut.i_v0_y.value = v0_y
-        dut.i_v1_x.value = v1_x
-        dut.i_v1_y.value = v1_y
-        dut.i_v2_x.value = v2_x
-        dut.i_v2_y.value = v2_y
-        dut.i_start.value = 1
+        await ClockCycles(dut.clk, 2)
 
-        await RisingEdge(dut.clk)
-        dut.i_start.value = 0
+        await start_triangle(ports, (v0_x, v0_y, v1_x, v1_y, v2_x, v2_y), 500)
 
         # Collect fragments
-        fragments = []
-        max_cycles = 500
-
-        for cycle in range(max_cycles):
-            await RisingEdge(dut.clk)
-
-            if int(dut.o_fragment_valid.value) == 1:
-                frag_x = int(dut.o_fragment_x.value)
-                frag_y = int(dut.o_fragment_y.value)
-                fragments.append((frag_x, frag_y))
-
-            if int(dut.o_done.value) == 1:
-                break
+        fragments = [(frag_x, frag_y) for frag_x, frag_y, *_ in await collect_until_done(ports)]
 
         dut._log.info(f"Edge case {i+1}: {len(fragments)} fragments generated")
 
@@ -286,180 +276,80 @@ async def test_rasterizer_edge_cases(dut):
 async def test_rasterizer_random_triangles(dut):
     """Test with random triangles"""
     dut._log.info("---- RASTERIZER RANDOM TRIANGLES TEST ----")
-
-    # Start a clock
-    clock = Clock(dut.clk, 10, units="ns")
-    cocotb.start_soon(clock.start())
+    ports = RasterizerPorts(dut)
 
     random.seed(42)  # For reproducible tests
-    num_tests = 100000
+    num_tests = 2000
 
-    for test_idx in range(num_tests):
-        # Generate random triangle vertices
-        v0_x = random.randint(-50, 50)
-        v0_y = random.randint(-50, 50)
-        v1_x = random.randint(-50, 50)
-        v1_y = random.randint(-50, 50)
-        v2_x = random.randint(-50, 50)
-        v2_y = random.randint(-50, 50)
+    # a few thousand triangles picked to hit every bin replace the old 100k sweep
+    coverage = {}
 
-        dut._log.info(f"Random test {test_idx+1}: Triangle ({v0_x},{v0_y}), ({v1_x},{v1_y}), ({v2_x},{v2_y})")
+    # RASTER_SHARDS > 1 splits the sweep across simulator processes (see
+    # `make rasterizer_shards`). every shard draws all triangles, so the
+    # sequence and the coverage check stay the same, but only simulates
+    # every RASTER_SHARDS-th one starting at RASTER_SHARD
+    num_shards = int(os.environ.get("RASTER_SHARDS", "1"))
+    shard = int(os.environ.get("RASTER_SHARD", "0"))
+    assert 0 <= shard < num_shards, f"RASTER_SHARD={shard} out of range for RASTER_SHARDS={num_shards}"
 
-        # Reset and setup
-        dut.rst_n.value = 0
-        await Timer(20, units="ns")
-        dut.rst_n.value = 1
-        await Timer(20, units="ns")
+    # Reset once, the rasterizer is back in idle after every triangle
+    dut.rst_n.value = 0
+    dut.i_start.value = 0
+    await ClockCycles(dut.clk, 2)
+    dut.rst_n.value = 1
+    await ClockCycles(dut.clk, 2)
 
-        dut.i_v0_x.value = v0_x
-        dut.i_v0_y.value = v0_y
-        dut.i_v1_x.value = v1_x
-        dut.i_v1_y.value = v1_y
-        dut.i_v2_x.value = v2_x
-        dut.i_v2_y.value = v2_y
-        dut.i_start.value = 1
+    for test_idx in range(num_tests):
+        if test_idx % 4 == 3:
+            # squeeze every fourth triangle into a small box so small and
+            # degenerate triangles actually show up in the sample
+            c_x = random.randint(-46, 46)
+            c_y = random.randint(-46, 46)
+            v0_x = c_x + random.randint(-4, 4)
+            v0_y = c_y + random.randint(-4, 4)
+            v1_x = c_x + random.randint(-4, 4)
+            v1_y = c_y + random.randint(-4, 4)
+            v2_x = c_x + random.randint(-4, 4)
+            v2_y = c_y + random.randint(-4, 4)
+        else:
+            # Generate random triangle vertices
+            v0_x = random.randint(-50, 50)
+            v0_y = random.randint(-50, 50)
+            v1_x = random.randint(-50, 50)
+            v1_y = random.randint(-50, 50)
+            v2_x = random.randint(-50, 50)
+            v2_y = random.randint(-50, 50)
 
-        await RisingEdge(dut.clk)
-        dut.i_start.value = 0
+        tri_bin = triangle_coverage_bin(v0_x, v0_y, v1_x, v1_y, v2_x, v2_y)
+        coverage[tri_bin] = coverage.get(tri_bin, 0) + 1
 
-        # Collect fragments
-        fragments = []
-        max_cycles = 2000
+        if test_idx % num_shards != shard:
+            continue
 
-        for cycle in range(max_cycles):
-            await RisingEdge(dut.clk)
+        dut._log.debug("Random test %d: Triangle (%d,%d), (%d,%d), (%d,%d)", test_idx + 1, v0_x, v0_y, v1_x, v1_y, v2_x, v2_y)
 
-            if int(dut.o_fragment_valid.value) == 1:
-                frag_x = int(dut.o_fragment_x.value)
-                frag_y = int(dut.o_fragment_y.value)
-                lambda0 = int(dut.o_lambda0.value)
-                lambda1 = int(dut.o_lambda1.value)
-                lambda2 = int(dut.o_lambda2.value)
-                fragments.append((frag_x, frag_y, lambda0, lambda1, lambda2))
+        # the scan visits every pixel of the bounding box once
+        min_x, min_y, max_x, max_y = get_triangle_bounding_box(v0_x, v0_y, v1_x, v1_y, v2_x, v2_y)
+        scan_cycles = (max_x - min_x + 1) * (max_y - min_y + 1)
+        await start_triangle(ports, (v0_x, v0_y, v1_x, v1_y, v2_x, v2_y), scan_cycles + 4)
 
-            if int(dut.o_done.value) == 1:
-                break
+        # Collect fragments
+        fragments = await collect_until_done(ports)
 
-        dut._log.info(f"Random test {test_idx+1}: {len(fragments)} fragments generated")
+        dut._log.debug("Random test %d: %d fragments generated", test_idx + 1, len(fragments))
 
         # Just check that the rasterizer completed and generated some valid fragments
         # Don't check exact barycentric coordinates due to potential precision differences
-        for frag_x, frag_y, lambda0, lambda1, lambda2 in fragments:
-            # Basic sanity checks
-            assert lambda0 >= -10000 and lambda0 <= 10000, f"Lambda0 out of reasonable range: {lambda0}"
-            assert lambda1 >= -10000 and lambda1 <= 10000, f"Lambda1 out of reasonable range: {lambda1}"
-            assert lambda2 >= -10000 and lambda2 <= 10000, f"Lambda2 out of reasonable range: {lambda2}"
+        # Basic sanity checks, one numpy range check over every fragment's lambdas
+        lambdas = np.array(fragments, dtype=np.int64).reshape(-1, 5)[:, 2:]
+        out_of_range = np.argwhere(np.abs(lambdas) > 10000)
+        assert len(out_of_range) == 0, \
+            f"Lambda{out_of_range[0][1]} out of reasonable range: {lambdas[tuple(out_of_range[0])]}"
+
+    for tri_bin in RANDOM_TRIANGLE_BINS:
+        dut._log.info(f"Coverage {tri_bin}: {coverage.get(tri_bin, 0)} triangles")
+    for tri_bin in RANDOM_TRIANGLE_BINS:
+        assert coverage.get(tri_bin, 0) >= MIN_BIN_HITS, \
+            f"Coverage FAILED: bin {tri_bin} hit {coverage.get(tri_bin, 0)} times, need {MIN_BIN_HITS}"
 
     dut._log.info("Random triangles test passed!")
-
-
-@cocotb.test()
-async def test_rasterizer_bounding_box(dut):
-    """Test that rasterizer only processes pixels within bounding box"""
-    dut._log.info("---- RASTERIZER BOUNDING BOX TEST ----")
-
-    # Start a clock
-    clock = Clock(dut.clk, 10, units="ns")
-    cocotb.start_soon(clock.start())
-
-    # Triangle with known bounding box
-    v0_x, v0_y = 10, 10
-    v1_x, v1_y = 20, 15
-    v2_x, v2_y = 15, 25
-
-    min_x, min_y, max_x, max_y = get_triangle_bounding_box(v0_x, v0_y, v1_x, v1_y, v2_x, v2_y)
-
-    # Reset and setup
-    dut.rst_n.value = 0
-    await Timer(20, units="ns")
-    dut.rst_n.value = 1
-    await Timer(20, units="ns")
-
-    dut.i_v0_x.value = v0_x
-    dut.i_v0_y.value = v0_y
-    dut.i_v1_x.value = v1_x
-    dut.i_v1_y.value = v1_y
-    dut.i_v2_x.value = v2_x
-    dut.i_v2_y.value = v2_y
-    dut.i_start.value = 1
-
-    await RisingEdge(dut.clk)
-    dut.i_start.value = 0
-
-    # Collect fragments
-    fragments = []
-    max_cycles = 1000
-
-    for cycle in range(max_cycles):
-        await RisingEdge(dut.clk)
-
-        if int(dut.o_fragment_valid.value) == 1:
-            frag_x = int(dut.o_fragment_x.value)
-            frag_y = int(dut.o_fragment_y.value)
-            fragments.append((frag_x, frag_y))
-
-        if int(dut.o_done.value) == 1:
-            break
-
-    # Verify all fragments are within bounding box
-    for frag_x, frag_y in fragments:
-        assert min_x <= frag_x <= max_x, f"Fragment x={frag_x} outside bounding box [{min_x}, {max_x}]"
-        assert min_y <= frag_y <= max_y, f"Fragment y={frag_y} outside bounding box [{min_y}, {max_y}]"
-
-    dut._log.info(f"Bounding box test passed! All {len(fragments)} fragments within expected bounds.")
-
-
-@cocotb.test()
-async def test_rasterizer_done_signal(dut):
-    """Test that done signal works correctly"""
-    dut._log.info("---- RASTERIZER DONE SIGNAL TEST ----")
-
-    # Start a clock
-    clock = Clock(dut.clk, 10, units="ns")
-    cocotb.start_soon(clock.start())
-
-    # Simple triangle
-    v0_x, v0_y = 0, 0
-    v1_x, v1_y = 5, 0
-    v2_x, v2_y = 2, 4
-
-    # Reset and setup
-    dut.rst_n.value = 0
-    await Timer(20, units="ns")
-    dut.rst_n.value = 1
-    await Timer(20, units="ns")
-
-    dut.i_v0_x.value = v0_x
-    dut.i_v0_y.value = v0_y
-    dut.i_v1_x.value = v1_x
-    dut.i_v1_y.value = v1_y
-    dut.i_v2_x.value = v2_x
-    dut.i_v2_y.value = v2_y
-    dut.i_start.value = 1
-
-    await RisingEdge(dut.clk)
-    dut.i_start.value = 0
-
-    # Wait for completion
-    done_detected = False
-    cycles_after_done = 0
-    max_cycles = 500
-
-    for cycle in range(max_cycles):
-        await RisingEdge(dut.clk)
-
-        if int(dut.o_done.value) == 1:
-            done_detected = True
-            cycles_after_done = 0
-        elif done_detected:
-            cycles_after_done += 1
-            # After done is asserted, it should remain high
-            assert int(dut.o_done.value) == 1, "Done signal should remain high after completion"
-            # No more valid fragments should be output
-            assert int(dut.o_fragment_valid.value) == 0, "No valid fragments should be output after done"
-
-        if cycles_after_done > 5:  # Check for a few cycles after done
-            break
-
-    assert done_detected, "Done signal was never asserted"
-    dut._log.info("Done signal test passed!")
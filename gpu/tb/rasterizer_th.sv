@@ -0,0 +1,92 @@
+// test harness around the rasterizer for rasterizer_tb.py
+// the clock toggles inside the simulator so cocotb only wakes up on the
+// edges a test actually awaits instead of on every half period
+module rasterizer_th #(
+    parameter int CORD_WIDTH = 10,
+    parameter int CLK_PERIOD = 10,  // ns
+    parameter int MAX_FRAGMENTS = 16384
+);
+
+  logic clk = 1'b0;
+  always #(CLK_PERIOD / 2) clk = ~clk;
+
+  // driven from python
+  logic rst_n;
+  logic i_start;
+  // all six coordinates in one bus so a triangle is a single write,
+  // packed {v2_y, v2_x, v1_y, v1_x, v0_y, v0_x}
+  logic [(CORD_WIDTH*6)-1:0] i_vertices;
+
+  logic signed [CORD_WIDTH-1:0] i_v0_x, i_v0_y;
+  logic signed [CORD_WIDTH-1:0] i_v1_x, i_v1_y;
+  logic signed [CORD_WIDTH-1:0] i_v2_x, i_v2_y;
+  assign {i_v2_y, i_v2_x, i_v1_y, i_v1_x, i_v0_y, i_v0_x} = i_vertices;
+
+  // watchdog limit in clock edges after i_start, loaded with the triangle
+  logic [31:0] i_timeout_cycles;
+
+  // sampled from python
+  logic o_fragment_valid;
+  logic signed [CORD_WIDTH-1:0] o_fragment_x;
+  logic signed [CORD_WIDTH-1:0] o_fragment_y;
+  logic signed [(CORD_WIDTH*2):0] o_lambda0;
+  logic signed [(CORD_WIDTH*2):0] o_lambda1;
+  logic signed [(CORD_WIDTH*2):0] o_lambda2;
+  logic o_done;
+
+  // fragments captured since the last i_start, read back through u_capture
+  logic [31:0] o_frag_count;
+
+  // rises once i_timeout_cycles edges after i_start if no new triangle
+  // started, so python can wait on done or timeout instead of a timer
+  logic o_timeout;
+  logic [31:0] timeout_count;
+
+  rasterizer #(
+      .CORD_WIDTH(CORD_WIDTH)
+  ) dut (
+      .clk(clk),
+      .rst_n(rst_n),
+      .i_start(i_start),
+      .i_v0_x(i_v0_x),
+      .i_v0_y(i_v0_y),
+      .i_v1_x(i_v1_x),
+      .i_v1_y(i_v1_y),
+      .i_v2_x(i_v2_x),
+      .i_v2_y(i_v2_y),
+      .o_fragment_valid(o_fragment_valid),
+      .o_fragment_x(o_fragment_x),
+      .o_fragment_y(o_fragment_y),
+      .o_lambda0(o_lambda0),
+      .o_lambda1(o_lambda1),
+      .o_lambda2(o_lambda2),
+      .o_done(o_done)
+  );
+
+  frag_capture #(
+      .CORD_WIDTH(CORD_WIDTH),
+      .DEPTH(MAX_FRAGMENTS)
+  ) u_capture (
+      .clk(clk),
+      .i_clear(i_start),
+      .i_fragment_valid(o_fragment_valid),
+      .i_fragment_x(o_fragment_x),
+      .i_fragment_y(o_fragment_y),
+      .i_lambda0(o_lambda0),
+      .i_lambda1(o_lambda1),
+      .i_lambda2(o_lambda2),
+      .o_count(o_frag_count)
+  );
+
+  // 0 disables the watchdog
+  always_ff @(posedge clk) begin
+    if (!rst_n || i_start) begin
+      timeout_count <= '0;
+      o_timeout <= 1'b0;
+    end else if (!o_timeout && i_timeout_cycles != '0) begin
+      timeout_count <= timeout_count + 1;
+      o_timeout <= (timeout_count + 1) == i_timeout_cycles;
+    end
+  end
+
+endmodule
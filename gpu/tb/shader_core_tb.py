@@ -1,6 +1,8 @@
 import cocotb
 from cocotb.clock import Clock
-from cocotb.triggers import RisingEdge, ClockCycles, Timer
+from cocotb.triggers import RisingEdge, ClockCycles, Timer, Event
+from cocotb.queue import Queue
+import logging
 import random
 import numpy as np
 
@@ -18,40 +20,126 @@ class AluOpcodes:
     NOP  = 0b00000  # No operation (returns 0)
 
 class ShaderCoreMonitor:
-    def __init__(self, dut):
+    # one preallocated column per field instead of a dict per operation,
+    # record_operation is a handful of scalar stores. doubles when full
+    COLUMNS = (
+        ('cycle', np.int64),
+        ('opcode', np.uint8),
+        ('rd', np.uint8),
+        ('rs1', np.uint8),
+        ('rs2', np.uint8),
+    )
+    
+    def __init__(self, dut, capacity=1024):
         self.dut = dut
-        self.operations = []
+        for name, dtype in self.COLUMNS:
+            setattr(self, name, np.empty(capacity, dtype=dtype))
+        self.num_operations = 0
         self.pipeline_state = []
         self.register_writes = {}
-        self.hazards_detected = []
+    
+    def _grow(self):
+        n = self.num_operations
+        for name, dtype in self.COLUMNS:
+            column = np.empty(2 * len(getattr(self, name)), dtype=dtype)
+            column[:n] = getattr(self, name)[:n]
+            setattr(self, name, column)
         
     def record_operation(self, cycle, opcode, rd, rs1, rs2):
-        op_record = {
-            'cycle': cycle,
-            'opcode': opcode,
-            'rd': rd,
-            'rs1': rs1,
-            'rs2': rs2
-        }
-        self.operations.append(op_record)
+        n = self.num_operations
+        if n == len(self.opcode):
+            self._grow()
         
-        if len(self.operations) >= 2:
-            prev_op = self.operations[-2]
-            if prev_op['rd'] in [rs1, rs2] and prev_op['rd'] != 0:
-                self.hazards_detected.append({
-                    'type': 'RAW',
-                    'cycle': cycle,
-                    'register': prev_op['rd']
-                })
+        self.cycle[n] = cycle
+        self.opcode[n] = opcode
+        self.rd[n] = rd
+        self.rs1[n] = rs1
+        self.rs2[n] = rs2
+        self.num_operations = n + 1
+    
+    def count_raw_hazards(self):
+        # RAW hazard, an op reads a (nonzero) register the op before it writes.
+        # only the stats need it, so it runs once over the whole trace
+        n = self.num_operations
+        if n < 2:
+            return 0
+        prev_rd = self.rd[:n - 1]
+        raw = (prev_rd == self.rs1[1:n]) | (prev_rd == self.rs2[1:n])
+        raw &= prev_rd != 0
+        return int(raw.sum())
     
     def get_statistics(self):
+        n = self.num_operations
         return {
-            'total_operations': len(self.operations),
-            'unique_opcodes': len(set(op['opcode'] for op in self.operations)),
-            'hazards_detected': len(self.hazards_detected),
+            'total_operations': n,
+            'unique_opcodes': len(np.unique(self.opcode[:n])),
+            'hazards_detected': self.count_raw_hazards(),
             'register_utilization': len(self.register_writes)
         }
 
+class InstructionDriver:
+    """Drives queued instructions into the core, one per clock edge
+
+    Tests only enqueue (opcode, rd, rs1, rs2) with issue() or idle cycles
+    with bubble(), and await drain() where they need the core caught up.
+    Everything already queued goes out back to back without waking the test.
+    """
+    
+    def __init__(self, dut, monitor=None):
+        self.monitor = monitor
+        
+        # bind the handles once
+        self._clk = dut.clk
+        self._exec_en = dut.i_exec_en
+        self._opcode = dut.i_opcode
+        self._rd_addr = dut.i_rd_addr
+        self._rs1_addr = dut.i_rs1_addr
+        self._rs2_addr = dut.i_rs2_addr
+        
+        self._queue = Queue()
+        self._idle = Event()
+        self._idle.set()
+        
+        cocotb.start_soon(self._drive())
+    
+    def issue(self, opcode, rd, rs1, rs2):
+        self._idle.clear()
+        self._queue.put_nowait((opcode, rd, rs1, rs2))
+    
+    def bubble(self, cycles=1):
+        # exec_en low for this many edges
+        self._idle.clear()
+        for _ in range(cycles):
+            self._queue.put_nowait(None)
+    
+    async def drain(self):
+        # returns on the edge the last queued item was taken
+        await self._idle.wait()
+    
+    async def _drive(self):
+        clk_edge = RisingEdge(self._clk)
+        while True:
+            item = await self._queue.get()
+            while True:
+                if item is None:
+                    self._exec_en.value = 0
+                else:
+                    opcode, rd, rs1, rs2 = item
+                    self._opcode.value = opcode
+                    self._rd_addr.value = rd
+                    self._rs1_addr.value = rs1
+                    self._rs2_addr.value = rs2
+                    self._exec_en.value = 1
+                    if self.monitor is not None:
+                        self.monitor.record_operation(cocotb.utils.get_sim_time(), opcode, rd, rs1, rs2)
+                await clk_edge
+                if self._queue.empty():
+                    break
+                item = self._queue.get_nowait()
+            
+            self._exec_en.value = 0
+            self._idle.set()
+
 async def initialize_dut(dut):
     dut.i_exec_en.value = 0
     dut.i_opcode.value = AluOpcodes.NOP
@@ -124,6 +212,7 @@ async def test_shader_core_basic(dut):
     await reset_dut(dut)
     
     monitor = ShaderCoreMonitor(dut)
+    driver = InstructionDriver(dut, monitor)
     
     dut._log.info("Test 1: Basic arithmetic operations")
     
@@ -137,29 +226,23 @@ async def test_shader_core_basic(dut):
     ]
     
     for opcode, rd, rs1, rs2, desc in test_vectors:
-        dut._log.info(f"  Executing: {desc}")
-        monitor.record_operation(cocotb.simulator.get_sim_time(), opcode, rd, rs1, rs2)
-        await execute_instruction(dut, opcode, rd, rs1, rs2)
+        dut._log.info("  Executing: %s", desc)
+        driver.issue(opcode, rd, rs1, rs2)
+        driver.bubble(2)
     
     dut._log.info("Test 2: Pipeline behavior - back-to-back operations")
     
     for i in range(5):
-        dut.i_opcode.value = AluOpcodes.ADD
-        dut.i_rd_addr.value = (i + 1) % num_regs
-        dut.i_rs1_addr.value = i % num_regs
-        dut.i_rs2_addr.value = (i + 2) % num_regs
-        dut.i_exec_en.value = 1
-        await RisingEdge(dut.clk)
-        monitor.record_operation(cocotb.simulator.get_sim_time(), AluOpcodes.ADD, 
-                                (i + 1) % num_regs, i % num_regs, (i + 2) % num_regs)
-    
-    dut.i_exec_en.value = 0
-    await ClockCycles(dut.clk, 3)
+        driver.issue(AluOpcodes.ADD, (i + 1) % num_regs, i % num_regs, (i + 2) % num_regs)
+    driver.bubble(3)
     
     dut._log.info("Test 3: Data hazard scenarios")
     
-    await execute_instruction(dut, AluOpcodes.ADD, 1, 2, 3)
-    await execute_instruction(dut, AluOpcodes.SUB, 4, 1, 2)
+    driver.issue(AluOpcodes.ADD, 1, 2, 3)
+    driver.bubble(2)
+    driver.issue(AluOpcodes.SUB, 4, 1, 2)
+    driver.bubble(2)
+    await driver.drain()
     
     dut._log.info("Test 4: Writeback timing verification")
     
@@ -206,10 +289,11 @@ async def test_shader_core_vector_ops(dut):
         (AluOpcodes.MOVA, "Vector MOVA"),
     ]
     
+    gap = ClockCycles(dut.clk, 2)
     for opcode, desc in vector_ops:
-        dut._log.info(f"Testing {desc}")
+        dut._log.info("Testing %s", desc)
         await execute_instruction(dut, opcode, 1, 2, 3)
-        await ClockCycles(dut.clk, 2)
+        await gap
     
     dut._log.info("Vector operations test passed!")
 
@@ -225,6 +309,7 @@ async def test_shader_core_stress(dut):
     await reset_dut(dut)
     
     monitor = ShaderCoreMonitor(dut)
+    driver = InstructionDriver(dut, monitor)
     
     num_instructions = 1000
     instruction_mix = {
@@ -238,46 +323,46 @@ async def test_shader_core_stress(dut):
         AluOpcodes.MOVB: 0.025,
     }
     
-    opcodes = []
-    for op, weight in instruction_mix.items():
-        opcodes.extend([op] * int(weight * num_instructions))
-    random.shuffle(opcodes)
-    
-    active_cycles = 0
-    bubble_cycles = 0
-    
-    for i, opcode in enumerate(opcodes[:num_instructions]):
-        rd = random.randint(1, num_regs - 1)
-        rs1 = random.randint(0, num_regs - 1)
-        rs2 = random.randint(0, num_regs - 1)
-        
-        if random.random() < 0.1:
-            dut.i_exec_en.value = 0
-            await RisingEdge(dut.clk)
-            bubble_cycles += 1
-        
-        dut.i_opcode.value = opcode
-        dut.i_rd_addr.value = rd
-        dut.i_rs1_addr.value = rs1
-        dut.i_rs2_addr.value = rs2
-        dut.i_exec_en.value = 1
+    # draw the whole workload up front so the issue loop below makes no
+    # random calls, seeded from cocotb's seed like the other benches
+    rng = np.random.default_rng(random.getrandbits(64))
+    
+    # exact per-opcode counts from the mix, shuffled in place
+    mix_opcodes = np.fromiter(instruction_mix.keys(), dtype=np.uint8)
+    mix_counts = (np.fromiter(instruction_mix.values(), dtype=np.float64) * num_instructions).astype(np.int64)
+    opcodes = np.repeat(mix_opcodes, mix_counts)[:num_instructions]
+    rng.shuffle(opcodes)
+    opcodes = opcodes.tolist()
+    
+    rd_addrs = rng.integers(1, num_regs, size=len(opcodes))
+    rs1_addrs = rng.integers(0, num_regs, size=len(opcodes))
+    rs2_addrs = rng.integers(0, num_regs, size=len(opcodes))
+    # a bubble before ~10% of instructions, a 1-5 cycle pause after ~5%
+    bubbles = rng.random(len(opcodes)) < 0.1
+    pauses = np.where(rng.random(len(opcodes)) < 0.05, rng.integers(1, 6, size=len(opcodes)), 0)
+    
+    active_cycles = len(opcodes)
+    bubble_cycles = int(bubbles.sum() + pauses.sum())
+    
+    # progress lines are only worth formatting when someone will see them
+    progress_log = dut._log.isEnabledFor(logging.INFO)
+    
+    workload = zip(opcodes, rd_addrs.tolist(), rs1_addrs.tolist(), rs2_addrs.tolist(),
+                   bubbles.tolist(), pauses.tolist())
+    for i, (opcode, rd, rs1, rs2, bubble, pause_cycles) in enumerate(workload):
+        if bubble:
+            driver.bubble()
         
-        monitor.record_operation(cocotb.simulator.get_sim_time(), opcode, rd, rs1, rs2)
+        driver.issue(opcode, rd, rs1, rs2)
         
-        await RisingEdge(dut.clk)
-        active_cycles += 1
+        if pause_cycles:
+            driver.bubble(pause_cycles)
         
-        if random.random() < 0.05:
-            dut.i_exec_en.value = 0
-            pause_cycles = random.randint(1, 5)
-            await ClockCycles(dut.clk, pause_cycles)
-            bubble_cycles += pause_cycles
-        
-        if (i + 1) % 100 == 0:
-            dut._log.info(f"Stress test progress: {i + 1}/{num_instructions} instructions")
+        if (i + 1) % 100 == 0 and progress_log:
+            dut._log.info("Stress test progress: %d/%d instructions", i + 1, num_instructions)
     
-    dut.i_exec_en.value = 0
-    await ClockCycles(dut.clk, 3)
+    driver.bubble(3)
+    await driver.drain()
     
     stats = monitor.get_statistics()
     efficiency = active_cycles / (active_cycles + bubble_cycles) * 100
@@ -299,10 +384,12 @@ async def test_shader_core_memory_interface(dut):
     
     dut._log.info("Test 1: Memory interface with varying ready signal")
     
+    clk_edge = RisingEdge(dut.clk)
+    
     async def memory_controller():
         """Simulate memory controller with variable latency"""
         for _ in range(20):
-            await RisingEdge(dut.clk)
+            await clk_edge
             dut.i_mem_ready.value = random.choice([0, 1, 1, 1])  # 75% ready
     
     cocotb.start_soon(memory_controller())
@@ -311,9 +398,9 @@ async def test_shader_core_memory_interface(dut):
         await execute_instruction(dut, AluOpcodes.ADD, i % 8 + 1, 0, i % 8)
         
         if dut.o_mem_req.value == 1:
-            dut._log.info(f"  Memory request detected at cycle {i}")
+            dut._log.info("  Memory request detected at cycle %d", i)
             while dut.i_mem_ready.value == 0:
-                await RisingEdge(dut.clk)
+                await clk_edge
     
     dut._log.info("Memory interface test passed!")
 
@@ -337,13 +424,14 @@ async def test_shader_core_corner_cases(dut):
     await execute_instruction(dut, AluOpcodes.ADD, max_reg, max_reg, max_reg)
     
     dut._log.info("Test 3: Rapid execution enable toggling")
+    clk_edge = RisingEdge(dut.clk)
     for i in range(10):
         dut.i_exec_en.value = i % 2
         dut.i_opcode.value = AluOpcodes.XOR
         dut.i_rd_addr.value = (i % (num_regs - 1)) + 1
         dut.i_rs1_addr.value = i % num_regs
         dut.i_rs2_addr.value = (i + 1) % num_regs
-        await RisingEdge(dut.clk)
+        await clk_edge
     
     dut.i_exec_en.value = 0
     await ClockCycles(dut.clk, 3)
@@ -380,21 +468,17 @@ async def test_shader_core_performance(dut):
     await initialize_dut(dut)
     await reset_dut(dut)
     
+    driver = InstructionDriver(dut)
+    
     start_time = cocotb.utils.get_sim_time(units='ns')
     num_instructions = 500
     
     dut._log.info("Test 1: Maximum throughput measurement")
     
     for i in range(num_instructions):
-        dut.i_exec_en.value = 1
-        dut.i_opcode.value = AluOpcodes.ADD
-        dut.i_rd_addr.value = (i % 15) + 1
-        dut.i_rs1_addr.value = ((i + 1) % 15) + 1
-        dut.i_rs2_addr.value = ((i + 2) % 15) + 1
-        await RisingEdge(dut.clk)
-    
-    dut.i_exec_en.value = 0
-    await ClockCycles(dut.clk, 2)
+        driver.issue(AluOpcodes.ADD, (i % 15) + 1, ((i + 1) % 15) + 1, ((i + 2) % 15) + 1)
+    driver.bubble(2)
+    await driver.drain()
     
     end_time = cocotb.utils.get_sim_time(units='ns')
     elapsed_ns = end_time - start_time
@@ -416,21 +500,15 @@ async def test_shader_core_performance(dut):
         start_time = cocotb.utils.get_sim_time(units='ns')
         
         for i in range(count):
-            dut.i_exec_en.value = 1
-            dut.i_opcode.value = opcode
-            dut.i_rd_addr.value = (i % 15) + 1
-            dut.i_rs1_addr.value = ((i * 2) % 15) + 1
-            dut.i_rs2_addr.value = ((i * 3) % 15) + 1
-            await RisingEdge(dut.clk)
-        
-        dut.i_exec_en.value = 0
-        await ClockCycles(dut.clk, 2)
+            driver.issue(opcode, (i % 15) + 1, ((i * 2) % 15) + 1, ((i * 3) % 15) + 1)
+        driver.bubble(2)
+        await driver.drain()
         
         end_time = cocotb.utils.get_sim_time(units='ns')
         elapsed_ns = end_time - start_time
         ops_per_us = count / (elapsed_ns / 1000)
         
-        dut._log.info(f"  {name}: {ops_per_us:.2f} ops/μs")
+        dut._log.info("  %s: %.2f ops/μs", name, ops_per_us)
     
     dut._log.info("Performance test completed!")
 
@@ -452,10 +530,10 @@ async def test_shader_core_debug(dut):
     ]
     
     for opcode, rd, rs1, rs2, comment in test_sequence:
-        dut._log.info(f"  {comment}")
+        dut._log.info("  %s", comment)
         await execute_instruction(dut, opcode, rd, rs1, rs2)
         
-        dut._log.info(f"    exec_en={dut.i_exec_en.value}, write_en={dut.reg_write_en.value}")
+        dut._log.info("    exec_en=%s, write_en=%s", dut.i_exec_en.value, dut.reg_write_en.value)
     
     await ClockCycles(dut.clk, 5)
     
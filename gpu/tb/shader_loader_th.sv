@@ -0,0 +1,38 @@
+// test harness around the shader loader for shader_loader_tb.py
+// the clock toggles inside the simulator so cocotb only wakes up on the
+// edges a test actually awaits instead of on every half period
+module shader_loader_th #(
+    parameter int INSTR_WIDTH = 32,
+    parameter int INSTR_DEPTH = 256,
+    parameter int CLK_PERIOD = 10  // ns
+);
+
+  logic clk = 1'b0;
+  always #(CLK_PERIOD / 2) clk = ~clk;
+
+  // driven from python
+  logic                           rst_n;
+  logic                           i_host_we;
+  logic [$clog2(INSTR_DEPTH)-1:0] i_host_addr;
+  logic [INSTR_WIDTH-1:0]         i_host_wdata;
+  logic [$clog2(INSTR_DEPTH)-1:0] i_gpu_addr;
+
+  // sampled from python
+  logic [INSTR_WIDTH-1:0]         o_host_rdata;
+  logic [INSTR_WIDTH-1:0]         o_gpu_instr;
+
+  shader_loader #(
+      .INSTR_WIDTH(INSTR_WIDTH),
+      .INSTR_DEPTH(INSTR_DEPTH)
+  ) dut (
+      .clk(clk),
+      .rst_n(rst_n),
+      .i_host_we(i_host_we),
+      .i_host_addr(i_host_addr),
+      .i_host_wdata(i_host_wdata),
+      .o_host_rdata(o_host_rdata),
+      .i_gpu_addr(i_gpu_addr),
+      .o_gpu_instr(o_gpu_instr)
+  );
+
+endmodule